@@ -1,18 +1,48 @@
-from .imports import FastAPI, CORSMiddleware, os, StaticFiles, FileResponse, OAuth2PasswordBearer, load_dotenv, HTTPBearer, JSONResponse, Request
+from .imports import FastAPI, CORSMiddleware, os, FileResponse, OAuth2PasswordBearer, load_dotenv, HTTPBearer, JSONResponse, Request
 from . import models
-from .routers import auth, store, transactions, products, merchant
-from .database import engine
-from .config import build_frontend, DIST_DIR
+from .routers import auth, store, transactions, products, merchant, analytics
+from .database import engine, async_engine
+from .config import build_frontend, DIST_DIR, ASSETS_DIR, QUERY_TRACE, INDEXER_ENABLED, SWEEPER_ENABLED
+from .assets import PrecompressedStaticFiles, AppShell
+from .verification import verifier
+from .indexer import indexer
+from .sweeper import sweeper
+from .migrations import apply_schema_updates
+from . import passwords
+from .metrics import MetricsMiddleware, router as metrics_router
+from .querytrace import QueryTraceMiddleware
+from contextlib import asynccontextmanager
 
 build_frontend()
 models.Base.metadata.create_all(bind=engine)
+apply_schema_updates(engine)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Payment confirmations are verified off the request path
+    verifier.start()
+    # Confirms purchases whose buyers never submitted a transaction hash
+    if INDEXER_ENABLED:
+        indexer.start()
+    # Keeps abandoned checkouts out of the transactions table
+    if SWEEPER_ENABLED:
+        sweeper.start()
+    yield
+    sweeper.stop()
+    indexer.stop()
+    verifier.stop()
+    passwords.shutdown()
+    await async_engine.dispose()
+
+
 app = FastAPI(
     title="SplitStream API",
     description="API for a wallet software",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 oauth2_scheme = HTTPBearer()
@@ -26,14 +56,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
+if QUERY_TRACE:
+    app.add_middleware(QueryTraceMiddleware)
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(merchant.router)
+app.include_router(analytics.router)
 app.include_router(products.router)
 app.include_router(store.router)
 app.include_router(transactions.router)
+app.include_router(metrics_router)
 
 
 @app.exception_handler(404)
@@ -54,11 +90,13 @@ async def custom_404_handler(request: Request, exc):
 # Static Files & React Routing
 # ------------------------------
 # Safety check: Ensure the folder exists before mounting, or Uvicorn crashes.
-assets_path = os.path.join(DIST_DIR, "assets")
-if os.path.exists(assets_path):
-    app.mount("/assets", StaticFiles(directory=assets_path), name="assets")
+if os.path.exists(ASSETS_DIR):
+    app.mount("/assets", PrecompressedStaticFiles(directory=ASSETS_DIR), name="assets")
 else:
-    print(f"⚠️ Warning: Assets folder not found at {assets_path}. Frontend might look broken.")
+    print(f"⚠️ Warning: Assets folder not found at {ASSETS_DIR}. Frontend might look broken.")
+
+# index.html is read once; deep links are answered from memory
+app_shell = AppShell()
 
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon():
@@ -68,10 +106,9 @@ async def favicon():
     return {"error": "Favicon not found"}
 
 @app.get("/{full_path:path}", include_in_schema=False)
-async def serve_react(full_path: str):
-    index_path = os.path.join(DIST_DIR, "index.html")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
+async def serve_react(full_path: str, request: Request):
+    if app_shell.body is not None:
+        return app_shell.response(request.headers)
     return {
         "error": "Frontend build not found.", 
         "detail": "Please check console logs to see if 'npm run build' failed."
@@ -0,0 +1,116 @@
+# backend/assets.py
+"""
+Serving the React bundle.
+
+Vite fingerprints everything under dist/assets, so those files are cached
+forever and served from the .br/.gz variants written at build time.
+index.html is the only file that changes between deploys in place: it is
+kept in memory with an ETag and a short max-age.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from .config import DIST_DIR, SHELL_MAX_AGE, brotli
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# name-<hash>.ext, as emitted by Vite
+FINGERPRINTED = re.compile(r"-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Codings named in an Accept-Encoding header, minus those refused with q=0."""
+    accepted = set()
+    for token in accept_encoding.split(","):
+        coding, _, params = token.partition(";")
+        try:
+            q = float(params.strip().removeprefix("q=")) if params.strip().startswith("q=") else 1.0
+        except ValueError:
+            q = 1.0
+        if q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that prefers prebuilt .br/.gz variants and marks fingerprinted files immutable."""
+
+    def __init__(self, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        # The bundle does not change while the app runs; index the variants once
+        self.variants = {}
+        for root, _, names in os.walk(os.path.realpath(directory)):
+            for name in names:
+                if name.endswith((".br", ".gz")):
+                    path = os.path.join(root, name)
+                    self.variants[path] = os.stat(path)
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        headers = {"Vary": "Accept-Encoding"}
+        if FINGERPRINTED.search(os.path.basename(full_path)):
+            headers["Cache-Control"] = IMMUTABLE
+
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and full_path + suffix in self.variants:
+                response = FileResponse(
+                    full_path + suffix,
+                    status_code=status_code,
+                    stat_result=self.variants[full_path + suffix],
+                    headers={**headers, "Content-Encoding": encoding},
+                    media_type=mimetypes.guess_type(full_path)[0],
+                )
+                break
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class AppShell:
+    """index.html held in memory, with compressed copies and an ETag."""
+
+    def __init__(self, path: str = os.path.join(DIST_DIR, "index.html")):
+        self.body = None
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            self.body = f.read()
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.encoded = {"gzip": gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(self.body, quality=11)
+
+    def response(self, request_headers) -> Response:
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": f"public, max-age={SHELL_MAX_AGE}, must-revalidate",
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request_headers.get("if-none-match", "")
+        if self.etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+            return Response(status_code=304, headers=headers)
+
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.encoded:
+                return Response(
+                    self.encoded[encoding], media_type="text/html",
+                    headers={**headers, "Content-Encoding": encoding},
+                )
+        return Response(self.body, media_type="text/html", headers=headers)
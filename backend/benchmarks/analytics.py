@@ -0,0 +1,69 @@
+# backend/benchmarks/analytics.py
+"""
+/api/analytics over a year of sales as the history grows: the daily
+rollups against grouping the raw transactions table per request.
+
+    python -m backend.benchmarks.analytics --volumes 10000 100000 500000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from .common import timed, temp_session, temp_async_session, seed_merchant, add_sales
+from .. import models, stats
+from ..routers import analytics as analytics_router
+
+
+def raw_analytics(db, merchant, start: date, end: date, granularity: str):
+    # What the endpoint would cost without the rollups: every sale in range grouped per request
+    t = models.Transactions
+    period = func.strftime({"day": "%Y-%m-%d", "week": "%Y-%W", "month": "%Y-%m"}[granularity], t.created_at)
+    db.execute(
+        select(t.product_id, period, func.sum(t.amount), func.sum(t.quantity), func.count(t.id))
+        .where(t.merchant_id == merchant.id, t.status == "paid",
+               t.created_at >= start, t.created_at < end + timedelta(days=1))
+        .group_by(t.product_id, period)
+    ).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volumes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--granularity", choices=["day", "week", "month"], default="month")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "splitstream_bench_analytics.db")
+    db = temp_session(path)
+    adb = temp_async_session(path)
+    run = asyncio.new_event_loop().run_until_complete
+    merchant, products = seed_merchant(db)
+    end = date.today()
+    start = end - timedelta(days=364)
+
+    print(f"{'sales':>10} {'rollups (ms)':>13} {'raw (ms)':>10} {'backfill (s)':>13}")
+    loaded = 0
+    for volume in sorted(args.volumes):
+        add_sales(db, merchant, products, volume - loaded)
+        loaded = volume
+        backfill_s = timed(lambda: stats.backfill_daily_stats(db), repeat=1) / 1000
+
+        def run_rollups():
+            adb.expire_all()
+            run(analytics_router.analytics(start=start, end=end, granularity=args.granularity,
+                                           product_id=None, db=adb, current_user=merchant))
+
+        rollup_ms = timed(run_rollups)
+        raw_ms = timed(lambda: raw_analytics(db, merchant, start, end, args.granularity), repeat=2)
+        print(f"{volume:>10} {rollup_ms:>13.1f} {raw_ms:>10.1f} {backfill_s:>13.2f}")
+
+    run(adb.close())
+    db.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
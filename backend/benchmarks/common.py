@@ -0,0 +1,99 @@
+# backend/benchmarks/common.py
+import os
+import time
+
+# The chain module needs these at import; benchmarks never talk to a real node.
+os.environ.setdefault("MNEE_TOKEN_ADDRESS", "0x8ccedbae4916b79da7f3f612efb2eb93a2bfd6cf")
+os.environ.setdefault("CHAIN_ID", "1")
+os.environ.setdefault("RPC_URL", "http://127.0.0.1:8545")
+
+
+def timed(fn, repeat: int = 5) -> float:
+    """Best wall-clock time of fn() over a few runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def percentile(samples: list, pct: float) -> float:
+    """pct-quantile of latencies in seconds, in milliseconds."""
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct))] * 1000 if samples else 0.0
+
+
+def temp_session(path: str, pragmas: dict | None = None):
+    """Session on a fresh SQLite file with the app schema created."""
+    from sqlalchemy.orm import sessionmaker
+    from .. import models
+    from ..database import create_db_engine
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    engine = create_db_engine(f"sqlite:///{path}", pragmas=pragmas)
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def temp_async_session(path: str):
+    """AsyncSession on the same SQLite file, for calling the async routes directly."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from ..database import create_db_engine
+
+    engine = create_db_engine(f"sqlite:///{path}", asynchronous=True)
+    return async_sessionmaker(engine, autoflush=False, expire_on_commit=False)()
+
+
+def seed_merchant(db, username: str = "bench"):
+    """One merchant with three products and partner splits."""
+    from .. import models
+
+    merchant = models.User(
+        username=username,
+        email=f"{username}@example.com",
+        password="not-a-real-hash",
+        wallet_address="0x" + "ab" * 20,
+        unique_slug=username,
+    )
+    db.add(merchant)
+    db.flush()
+
+    products = []
+    for i, price in enumerate((50, 120, 300)):
+        product = models.Products(product_name=f"Product {i}", price=price, merchant_id=merchant.id)
+        product.splits = [
+            models.ProductSplits(wallet_address=merchant.wallet_address, percentage=70),
+            models.ProductSplits(wallet_address=f"0xpartner{i}", percentage=30),
+        ]
+        products.append(product)
+    db.add_all(products)
+    db.commit()
+    return merchant, products
+
+
+def add_sales(db, merchant, products, count: int, status: str = "paid"):
+    """Bulk insert count sales spread over the merchant's products."""
+    import random
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from .. import models
+
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        product = products[i % len(products)]
+        rows.append({
+            "merchant_id": merchant.id,
+            "product_id": product.id,
+            "quantity": 1,
+            "amount": product.price,
+            "status": status,
+            "tx_hash": f"0x{random.getrandbits(256):064x}",
+            "created_at": now - timedelta(seconds=random.randint(0, 365 * 86400)),
+        })
+    for start in range(0, len(rows), 10_000):
+        db.execute(insert(models.Transactions), rows[start:start + 10_000])
+    db.commit()
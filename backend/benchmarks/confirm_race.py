@@ -0,0 +1,174 @@
+# backend/benchmarks/confirm_race.py
+"""
+Concurrency check for payment confirmation: parallel /confirm-payment
+calls for one purchase, plus attempts to reuse the same transaction hash
+for a second purchase, against the app under uvicorn and a stub chain.
+
+    python -m backend.benchmarks.confirm_race --parallel 32 --rounds 20
+
+Either purchase may claim the hash first. Every round must end with
+exactly one of the two paid, once: one verification job, one RPC lookup
+and one set of payouts. Exits non-zero if any round does not.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from .load import REPO_ROOT, free_port, prepare_database, wait_until_up
+from .rpc_stub import StubChain, start_stub, transfer_log
+
+
+async def race(client, chain: StubChain, slug: str, parallel: int) -> dict:
+    from web3 import Web3
+    from ..chain import MNEE_TOKEN, token_contract, w3
+
+    product_id = (await client.get(f"/api/store/{slug}")).json()[0]["id"]
+    purchase, other = [
+        (await client.post("/api/make-purchase", json={"slug": slug, "product_id": product_id, "quantity": 1})).json()
+        for _ in range(2)
+    ]
+
+    wallet = Web3.to_checksum_address(purchase["merchant_wallet"])
+    wei = w3.to_wei(str(purchase["amount"]), "ether")
+    tx_hash = f"0x{random.getrandbits(256):064x}"
+    chain.add_transfer(tx_hash, MNEE_TOKEN, token_contract.encode_abi("transfer", args=[wallet, wei]),
+                       logs=[transfer_log(MNEE_TOKEN, "0x" + "cd" * 20, wallet, wei)])
+
+    requests_before = chain.requests
+    bodies = [{"transaction_id": purchase["transaction_id"], "tx_hash": tx_hash}] * parallel
+    # The same transfer offered as payment for a second purchase
+    bodies += [{"transaction_id": other["transaction_id"], "tx_hash": tx_hash}] * (parallel // 4)
+    random.shuffle(bodies)
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(client.post("/api/confirm-payment", json=body) for body in bodies))
+    elapsed = time.perf_counter() - start
+
+    jobs = {}
+    for r in responses:
+        if r.status_code == 202:
+            jobs.setdefault(r.json()["transaction_id"], set()).add(r.json()["verification_id"])
+    while True:
+        statuses = {(await client.get(f"/api/confirm-payment/{job}")).json()["status"]
+                    for ids in jobs.values() for job in ids}
+        if statuses <= {"confirmed", "failed"}:
+            break
+        await asyncio.sleep(0.05)
+
+    return {
+        "transaction_id": purchase["transaction_id"],
+        "other_id": other["transaction_id"],
+        "codes": Counter(r.status_code for r in responses),
+        "jobs": {transaction_id: len(ids) for transaction_id, ids in jobs.items()},
+        "statuses": statuses,
+        "rpc_requests": chain.requests - requests_before,
+        "seconds": elapsed,
+    }
+
+
+def check(database_url: str, result: dict) -> list:
+    """What went wrong with one round, read back from the database."""
+    from sqlalchemy import func
+    from sqlalchemy.orm import sessionmaker
+    from .. import models
+    from ..database import create_db_engine
+
+    engine = create_db_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        t = models.Transactions
+        purchases = [db.get(t, result["transaction_id"]), db.get(t, result["other_id"])]
+        paid = [p for p in purchases if p.status == "paid"]
+        if len(paid) != 1:
+            return [f"{len(paid)} of the two purchases paid by one hash"]
+        purchase = paid[0]
+        payouts = db.query(func.count(models.PendingPayout.id)).filter(
+            models.PendingPayout.transaction_source_id == purchase.id
+        ).scalar()
+        splits = db.query(func.count(models.ProductSplits.id)).filter(
+            models.ProductSplits.product_id == purchase.product_id
+        ).scalar() - 1  # the merchant's own share is not paid out
+        jobs = db.query(func.count(models.PaymentVerification.id)).filter(
+            models.PaymentVerification.transaction_id == purchase.id
+        ).scalar()
+    finally:
+        db.close()
+        engine.dispose()
+
+    problems = []
+    if payouts != splits:
+        problems.append(f"{payouts} payouts, expected {splits}")
+    if jobs != 1 or result["jobs"].get(purchase.id) != 1:
+        problems.append(f"{jobs} verification jobs")
+    if result["rpc_requests"] != 1:
+        problems.append(f"{result['rpc_requests']} RPC requests")
+    return problems
+
+
+async def drive(base_url: str, database_url: str, chain: StubChain, slug: str, parallel: int, rounds: int) -> int:
+    import httpx
+
+    failures = 0
+    limits = httpx.Limits(max_connections=parallel * 2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for i in range(rounds):
+            result = await race(client, chain, slug, parallel)
+            problems = check(database_url, result)
+            failures += bool(problems)
+            codes = ", ".join(f"{code}×{n}" for code, n in sorted(result["codes"].items()))
+            print(f"round {i + 1:>3}: {codes:<28} {result['seconds'] * 1000:>7.1f} ms  "
+                  + ("ok" if not problems else "❌ " + "; ".join(problems)))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parallel", type=int, default=32, help="concurrent confirmations per purchase")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="splitstream_race_")
+    database_url = f"sqlite:///{os.path.join(workdir, 'race.db')}"
+    slug = prepare_database(database_url, sales=0)
+
+    chain = StubChain()
+    stub = start_stub(chain)
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "RPC_URL": f"http://127.0.0.1:{stub.server_address[1]}",
+        "APP_ENV": "production",
+        "INDEXER_ENABLED": "0",  # only the confirmation path may pay the purchase
+        "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.api:app", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env,
+    )
+    try:
+        wait_until_up(base_url, server)
+        failures = asyncio.run(drive(base_url, database_url, chain, slug, args.parallel, args.rounds))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        stub.shutdown()
+
+    if failures:
+        print(f"❌ {failures}/{args.rounds} rounds paid a purchase more than once or not at all.")
+        sys.exit(1)
+    print(f"✅ {args.rounds} rounds, one purchase paid exactly once by each hash.")
+
+
+if __name__ == "__main__":
+    main()
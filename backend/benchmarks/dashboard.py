@@ -0,0 +1,66 @@
+# backend/benchmarks/dashboard.py
+"""
+/api/dashboard latency as a merchant's sales history grows.
+
+    python -m backend.benchmarks.dashboard --volumes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+from .common import timed, temp_session, temp_async_session, seed_merchant, add_sales
+from .. import models, stats
+from ..routers import merchant as merchant_router
+
+
+def legacy_dashboard(db, current_user):
+    # The pre-aggregation implementation: every sale loaded and summed in Python
+    my_products = db.query(models.Products).filter(models.Products.merchant_id == current_user.id).all()
+    product_ids = [p.id for p in my_products]
+    my_sales = db.query(models.Transactions).filter(
+        models.Transactions.product_id.in_(product_ids)
+    ).order_by(models.Transactions.created_at.desc()).all()
+    sum(sale.amount for sale in my_sales)
+    [sale.product.product_name for sale in my_sales[:8]]
+    [list(p.splits) for p in my_products]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volumes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the SQL implementation")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "splitstream_bench_dashboard.db")
+    db = temp_session(path)
+    adb = temp_async_session(path)
+    run = asyncio.new_event_loop().run_until_complete
+    merchant, products = seed_merchant(db)
+
+    print(f"{'sales':>10} {'sql (ms)':>10} {'legacy (ms)':>12}")
+    loaded = 0
+    for volume in sorted(args.volumes):
+        add_sales(db, merchant, products, volume - loaded)
+        stats.rebuild_stats(db)
+        loaded = volume
+
+        def run_sql():
+            adb.expire_all()
+            run(merchant_router.dashboard(db=adb, current_user=merchant))
+
+        def run_legacy():
+            db.expire_all()
+            legacy_dashboard(db, merchant)
+
+        sql_ms = timed(run_sql)
+        legacy_ms = "-" if args.skip_legacy else f"{timed(run_legacy, repeat=2):.1f}"
+        print(f"{volume:>10} {sql_ms:>10.1f} {legacy_ms:>12}")
+
+    run(adb.close())
+    db.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
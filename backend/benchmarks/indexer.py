@@ -0,0 +1,81 @@
+# backend/benchmarks/indexer.py
+"""
+Confirming a backlog of pending purchases: one transaction+receipt lookup
+per purchase (what /confirm-payment costs) against the transfer indexer's
+eth_getLogs range scans, both against the stub node.
+
+    python -m backend.benchmarks.indexer --purchases 5000 --latency 0.002
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import sessionmaker
+
+from .common import temp_session, seed_merchant, add_sales
+from .rpc_stub import StubChain, start_stub, transfer_log
+from .. import models
+from ..chain import MNEE_TOKEN, RPCClient
+from ..indexer import CHECKPOINT, TransferIndexer
+from ..splits import to_units, units_to_wei
+
+FIRST_BLOCK = 1_000
+REORG_DEPTH = 12
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--purchases", type=int, default=5_000)
+    parser.add_argument("--per-block", type=int, default=5, help="purchase transfers per block")
+    parser.add_argument("--chunk", type=int, default=2_000, help="blocks per eth_getLogs range")
+    parser.add_argument("--threads", type=int, default=4, help="concurrent lookups, like the verifier pool")
+    parser.add_argument("--latency", type=float, default=0.002, help="simulated node latency per HTTP request (s)")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "splitstream_bench_indexer.db")
+    db = temp_session(path)
+    merchant, products = seed_merchant(db)
+    add_sales(db, merchant, products, args.purchases, status="pending")
+    db.execute(update(models.Transactions).values(tx_hash=None))
+    db.add(models.IndexerCheckpoint(name=CHECKPOINT, block_number=FIRST_BLOCK - 1))
+    db.commit()
+
+    # One buyer transfer per pending purchase, a few per block
+    chain = StubChain(latency=args.latency)
+    hashes = []
+    for i, (amount,) in enumerate(db.query(models.Transactions.amount).order_by(models.Transactions.id)):
+        tx_hash = f"0x{i + 1:064x}"
+        wei = units_to_wei(to_units(amount))
+        chain.add_transfer(tx_hash, MNEE_TOKEN, "0x", block=FIRST_BLOCK + i // args.per_block,
+                           logs=[transfer_log(MNEE_TOKEN, "0x" + "cd" * 20, merchant.wallet_address, wei)])
+        hashes.append(tx_hash)
+    chain.block_number = FIRST_BLOCK + len(hashes) // args.per_block + REORG_DEPTH
+    server = start_stub(chain)
+    client = RPCClient(f"http://127.0.0.1:{server.server_address[1]}", pool_size=args.threads)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(client.get_transaction_with_receipt, hashes))
+    lookup_seconds = time.perf_counter() - start
+    lookup_requests, chain.requests = chain.requests, 0
+
+    indexer = TransferIndexer(client, sessionmaker(bind=db.get_bind()), chunk_blocks=args.chunk, reorg_depth=REORG_DEPTH)
+    start = time.perf_counter()
+    confirmed = indexer.run_once()
+    index_seconds = time.perf_counter() - start
+
+    pending = db.query(func.count(models.Transactions.id)).filter(models.Transactions.status == "pending").scalar()
+    payouts = db.query(func.count(models.PendingPayout.id)).scalar()
+    print(f"{'per-purchase lookups':<24} {lookup_requests:>7} RPC requests  {lookup_seconds:>7.2f}s  (RPC only)")
+    print(f"{'transfer indexer':<24} {chain.requests:>7} RPC requests  {index_seconds:>7.2f}s  (RPC, matching and commits)")
+    print(f"Confirmed {confirmed}/{len(hashes)} purchases, {pending} still pending, {payouts} payouts created.")
+
+    server.shutdown()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
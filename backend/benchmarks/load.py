@@ -0,0 +1,292 @@
+# backend/benchmarks/load.py
+"""
+End-to-end load test: the app runs under uvicorn on a temporary database
+with a stub chain, and concurrent clients drive a weighted mix of the
+storefront, checkout, merchant and login endpoints.
+
+    python -m backend.benchmarks.load --mix mixed --concurrency 32 --seconds 30
+    python -m backend.benchmarks.load --output before.json
+    python -m backend.benchmarks.load --compare before.json
+
+Throughput and p50/p95/p99 latency are reported per endpoint and written
+as JSON so runs can be compared across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from .common import percentile, seed_merchant, add_sales
+from .rpc_stub import StubChain, start_stub, transfer_log
+
+# Relative weights of each scenario per mix
+MIXES = {
+    "browse": {"store": 90, "purchase": 10},
+    "checkout": {"store": 40, "purchase": 30, "confirm": 30},
+    "merchant": {"dashboard": 40, "transactions": 40, "login": 20},
+    "mixed": {"store": 45, "purchase": 15, "confirm": 10, "dashboard": 12, "transactions": 12, "login": 6},
+}
+
+PASSWORD = "bench-password"
+CONFIRM_TIMEOUT = 30
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=REPO_ROOT,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def prepare_database(url: str, sales: int) -> str:
+    """Schema, one merchant with a real password hash, and a sales history; returns the store slug."""
+    from sqlalchemy.orm import sessionmaker
+    from .. import models, stats
+    from ..database import create_db_engine
+    from ..passwords import pwd_cxt
+
+    engine = create_db_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    merchant, products = seed_merchant(db)
+    merchant.password = pwd_cxt.hash(PASSWORD)
+    db.commit()
+    add_sales(db, merchant, products, sales)
+    stats.rebuild_stats(db)
+    slug = merchant.unique_slug
+    db.close()
+    engine.dispose()
+    return slug
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def add(self, endpoint: str, seconds: float, ok: bool):
+        if ok:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+        else:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, seconds: float) -> dict:
+        endpoints = sorted(set(self.latencies) | set(self.errors))
+        return {
+            endpoint: {
+                "requests": len(self.latencies.get(endpoint, [])),
+                "errors": self.errors.get(endpoint, 0),
+                "rps": len(self.latencies.get(endpoint, [])) / seconds,
+                "p50_ms": percentile(self.latencies.get(endpoint, []), 0.50),
+                "p95_ms": percentile(self.latencies.get(endpoint, []), 0.95),
+                "p99_ms": percentile(self.latencies.get(endpoint, []), 0.99),
+            }
+            for endpoint in endpoints
+        }
+
+
+class Scenarios:
+    """One method per entry in MIXES; each issues its requests and records their latency."""
+
+    def __init__(self, client, chain: StubChain, slug: str, token: str, recorder: Recorder):
+        self.client = client
+        self.chain = chain
+        self.slug = slug
+        self.auth = {"Authorization": f"Bearer {token}"}
+        self.recorder = recorder
+        self.store_products = []
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        self.recorder.add(endpoint, time.perf_counter() - start, ok)
+        return response if ok else None
+
+    async def store(self):
+        response = await self.request("GET /api/store/{slug}", "GET", f"/api/store/{self.slug}")
+        if response is not None and not self.store_products:
+            self.store_products = [p["id"] for p in response.json()]
+
+    async def purchase(self):
+        if not self.store_products:
+            return await self.store()
+        return await self.request("POST /api/make-purchase", "POST", "/api/make-purchase", json={
+            "slug": self.slug, "product_id": random.choice(self.store_products), "quantity": 1,
+        })
+
+    async def confirm(self):
+        from web3 import Web3
+        from ..chain import MNEE_TOKEN, token_contract, w3
+
+        response = await self.purchase()
+        if response is None:
+            return
+        purchase = response.json()
+
+        # The buyer's transfer, as the stub node will report it
+        wallet = Web3.to_checksum_address(purchase["merchant_wallet"])
+        wei = w3.to_wei(str(purchase["amount"]), "ether")
+        tx_hash = f"0x{random.getrandbits(256):064x}"
+        data = token_contract.encode_abi("transfer", args=[wallet, wei])
+        self.chain.add_transfer(tx_hash, MNEE_TOKEN, data, logs=[transfer_log(MNEE_TOKEN, "0x" + "cd" * 20, wallet, wei)])
+
+        start = time.perf_counter()
+        response = await self.request("POST /api/confirm-payment", "POST", "/api/confirm-payment", json={
+            "transaction_id": purchase["transaction_id"], "tx_hash": tx_hash,
+        })
+        if response is None:
+            return
+
+        # Time until the background verifier settles the sale, as the buyer's page sees it
+        verification_id = response.json()["verification_id"]
+        while time.perf_counter() - start < CONFIRM_TIMEOUT:
+            status = await self.client.get(f"/api/confirm-payment/{verification_id}")
+            state = status.json().get("status")
+            if state in ("confirmed", "failed"):
+                self.recorder.add("confirm-payment (settled)", time.perf_counter() - start, state == "confirmed")
+                return
+            await asyncio.sleep(0.05)
+        self.recorder.add("confirm-payment (settled)", time.perf_counter() - start, False)
+
+    async def dashboard(self):
+        await self.request("GET /api/dashboard", "GET", "/api/dashboard", headers=self.auth)
+
+    async def transactions(self):
+        await self.request("GET /api/transactions", "GET", "/api/transactions", headers=self.auth)
+
+    async def login(self):
+        await self.request("POST /api/login", "POST", "/api/login", json={"username": "bench", "password": PASSWORD})
+
+
+async def worker(scenarios: Scenarios, weights: dict, until: float):
+    names = list(weights)
+    while time.perf_counter() < until:
+        await getattr(scenarios, random.choices(names, weights=list(weights.values()))[0])()
+
+
+async def drive(base_url: str, chain: StubChain, slug: str, mix: dict, concurrency: int, seconds: float) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        token = (await client.post("/api/login", json={"username": "bench", "password": PASSWORD})).json()["access_token"]
+
+        # Warm caches and connections before measuring
+        warmup = Scenarios(client, chain, slug, token, Recorder())
+        await asyncio.gather(*(worker(warmup, mix, time.perf_counter() + 2) for _ in range(concurrency)))
+
+        recorder = Recorder()
+        scenarios = Scenarios(client, chain, slug, token, recorder)
+        until = time.perf_counter() + seconds
+        await asyncio.gather(*(worker(scenarios, mix, until) for _ in range(concurrency)))
+    return recorder.summary(seconds)
+
+
+def wait_until_up(base_url: str, server: subprocess.Popen, timeout: float = 60):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("The app exited during startup; see the output above")
+        try:
+            httpx.get(f"{base_url}/api/store/bench", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("The app did not start in time")
+
+
+def print_results(results: dict, baseline: dict | None):
+    print(f"\n{'endpoint':<30} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for endpoint, r in results["endpoints"].items():
+        line = f"{endpoint:<30} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>7}"
+        before = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if before and before["rps"]:
+            line += f"   rps {(r['rps'] / before['rps'] - 1) * 100:+.0f}%, p95 {r['p95_ms'] - before['p95_ms']:+.1f} ms"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--sales", type=int, default=10_000, help="sales history loaded before the run")
+    parser.add_argument("--rpc-latency", type=float, default=0.0, help="seconds the stub node waits per request")
+    parser.add_argument("--output", help="where to write the JSON results (default load-<commit>-<mix>.json)")
+    parser.add_argument("--compare", help="earlier JSON results to print deltas against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="splitstream_load_")
+    database_url = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    slug = prepare_database(database_url, args.sales)
+
+    chain = StubChain(latency=args.rpc_latency)
+    stub = start_stub(chain)
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "RPC_URL": f"http://127.0.0.1:{stub.server_address[1]}",
+        "APP_ENV": "production",  # never build the frontend during a benchmark
+        "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.api:app", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env,
+    )
+    try:
+        wait_until_up(base_url, server)
+        endpoints = asyncio.run(drive(base_url, chain, slug, MIXES[args.mix], args.concurrency, args.seconds))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        stub.shutdown()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": vars(args),
+        "endpoints": endpoints,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    output = args.output or f"load-{results['commit']}-{args.mix}.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# backend/benchmarks/login_load.py
+"""
+Login throughput alongside concurrent storefront traffic.
+
+Compare inline hashing with the process pool by running it twice:
+
+    PASSWORD_POOL_SIZE=0 python -m backend.benchmarks.login_load
+    PASSWORD_POOL_SIZE=4 python -m backend.benchmarks.login_load
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from .common import percentile
+
+
+async def drive(client, method: str, url: str, body, until: float, latencies: list, rejected: list):
+    while time.perf_counter() < until:
+        start = time.perf_counter()
+        response = await client.request(method, url, json=body)
+        if response.status_code == 503:
+            rejected.append(1)
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def phase(client, seconds: float, logins: int, browsers: int) -> dict:
+    until = time.perf_counter() + seconds
+    login_latencies, store_latencies, rejected = [], [], []
+    credentials = {"username": "bench", "password": "bench-password"}
+    await asyncio.gather(
+        *(drive(client, "POST", "/api/login", credentials, until, login_latencies, rejected) for _ in range(logins)),
+        *(drive(client, "GET", "/api/store/bench", None, until, store_latencies, rejected) for _ in range(browsers)),
+    )
+    return {
+        "logins/s": len(login_latencies) / seconds,
+        "rejected (503)": len(rejected),
+        "login p50 ms": percentile(login_latencies, 0.50),
+        "login p95 ms": percentile(login_latencies, 0.95),
+        "store req/s": len(store_latencies) / seconds,
+        "store p50 ms": percentile(store_latencies, 0.50),
+        "store p95 ms": percentile(store_latencies, 0.95),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--logins", type=int, default=16, help="concurrent login clients")
+    parser.add_argument("--browsers", type=int, default=16, help="concurrent storefront clients")
+    args = parser.parse_args()
+
+    # The app opens ./users.db; keep the benchmark database out of the repo
+    os.chdir(tempfile.mkdtemp(prefix="splitstream_bench_"))
+
+    import httpx
+    from .common import seed_merchant
+    from .. import passwords
+    from ..api import app
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    merchant, _ = seed_merchant(db)
+    merchant.password = passwords.pwd_cxt.hash("bench-password")
+    db.commit()
+    db.close()
+
+    print(f"PASSWORD_POOL_SIZE={passwords.PASSWORD_POOL_SIZE} BCRYPT_ROUNDS={passwords.BCRYPT_ROUNDS}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/api/login", json={"username": "bench", "password": "bench-password"})  # warm the pool
+
+        for label, logins in (("storefront only", 0), ("storefront + logins", args.logins)):
+            result = await phase(client, args.seconds, logins, args.browsers)
+            print(f"\n{label}")
+            for key, value in result.items():
+                print(f"  {key:<14} {value:>9.1f}")
+
+    passwords.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
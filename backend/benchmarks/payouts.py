@@ -0,0 +1,77 @@
+# backend/benchmarks/payouts.py
+"""
+Payout generation for a backlog of confirmed sales: the per-sale ORM loop
+against compiled split plans with one bulk insert.
+
+    python -m backend.benchmarks.payouts --sales 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import delete, func
+
+from .common import temp_session, seed_merchant, add_sales
+from .. import models
+from ..splits import generate_payouts, to_units
+
+
+def legacy_payouts(db, sales):
+    # The previous implementation: splits walked and float shares added per sale
+    for sale in sales:
+        product = db.get(models.Products, sale.product_id)
+        merchant = db.get(models.User, sale.merchant_id)
+        for split in product.splits:
+            if split.wallet_address.lower() == merchant.wallet_address.lower():
+                continue
+            db.add(models.PendingPayout(
+                merchant_id=sale.merchant_id,
+                recipient_wallet=split.wallet_address,
+                amount=float(sale.amount) * (split.percentage / 100),
+                status="unpaid",
+                transaction_source_id=sale.id,
+            ))
+    db.flush()
+
+
+def run(db, fn, sales) -> float:
+    db.execute(delete(models.PendingPayout))
+    db.commit()
+    start = time.perf_counter()
+    fn(db, sales)
+    db.commit()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sales", type=int, default=50_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "splitstream_bench_payouts.db")
+    db = temp_session(path)
+    merchant, products = seed_merchant(db)
+    add_sales(db, merchant, products, args.sales)
+    sales = db.query(
+        models.Transactions.id, models.Transactions.product_id,
+        models.Transactions.merchant_id, models.Transactions.amount,
+    ).all()
+
+    legacy_s = run(db, legacy_payouts, sales)
+    batched_s = run(db, generate_payouts, sales)
+
+    owed_units = db.query(func.sum(models.PendingPayout.amount_units)).scalar()
+    expected_units = sum(to_units(sale.amount) * 30 // 100 for sale in sales)
+
+    print(f"{'implementation':<16} {'seconds':>8} {'sales/s':>10}")
+    print(f"{'per-sale loop':<16} {legacy_s:>8.2f} {args.sales / legacy_s:>10.0f}")
+    print(f"{'compiled plans':<16} {batched_s:>8.2f} {args.sales / batched_s:>10.0f}")
+    print(f"\nowed units {owed_units} (expected {expected_units})")
+
+    db.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# backend/benchmarks/query_budgets.py
+"""
+Check every @query_budget declaration: each budgeted endpoint is called
+once through TestClient inside enforce_query_budgets(), against the demo
+merchant on a scratch database and a stub chain.
+
+    python -m backend.benchmarks.query_budgets
+
+Caches are cleared before each request, so the cold path is what is
+counted. Exits non-zero if an endpoint runs more statements than it
+declares, fails, or has a budget but no request here.
+"""
+import os
+import random
+import sys
+import tempfile
+
+from .rpc_stub import StubChain, start_stub, transfer_log
+
+PARTNER = "0x" + "ab" * 20   # settled with one batch transfer
+RECIPIENT = "0x" + "cd" * 20  # settled through the ledger
+MARKED = "0x" + "ef" * 20     # one payout marked paid on its own
+
+
+def prepare(db, chain: StubChain) -> dict:
+    """Demo data with an outdated password hash, unpaid payouts for three wallets and the transfers that pay them."""
+    from .. import models
+    from ..chain import MNEE_TOKEN
+    from ..passwords import pwd_cxt
+    from ..seed import seed_demo_user
+    from ..splits import units_to_wei
+
+    seed_demo_user(db)
+    merchant = db.query(models.User).filter(models.User.username == "example").one()
+    # A hash below the configured cost, so login takes the rehash path
+    merchant.password = pwd_cxt.handler("bcrypt").using(rounds=4).hash("1234")
+    source = db.query(models.Transactions).filter(models.Transactions.status == "paid").first()
+
+    payouts = [
+        models.PendingPayout(merchant_id=merchant.id, recipient_wallet=wallet, amount=1, amount_units=10 ** 8,
+                             status="unpaid", transaction_source_id=source.id)
+        for wallet in (PARTNER, PARTNER, RECIPIENT, RECIPIENT, MARKED)
+    ]
+    db.add_all(payouts)
+    db.commit()
+
+    settlement, ledger_settlement, marked = (f"0x{random.getrandbits(256):064x}" for _ in range(3))
+    chain.add_transfer(settlement, MNEE_TOKEN, "0x", block=chain.block_number - 100, logs=[
+        transfer_log(MNEE_TOKEN, merchant.wallet_address, PARTNER, units_to_wei(payout.amount_units))
+        for payout in payouts[:2]
+    ])
+    # One transfer of the recipient's whole balance, as the payouts page sends it
+    chain.add_transfer(ledger_settlement, MNEE_TOKEN, "0x", block=chain.block_number - 100, logs=[
+        transfer_log(MNEE_TOKEN, merchant.wallet_address, RECIPIENT, units_to_wei(payouts[3].amount_units * 2)),
+    ])
+    chain.add_transfer(marked, MNEE_TOKEN, "0x", block=chain.block_number - 100, logs=[
+        transfer_log(MNEE_TOKEN, merchant.wallet_address, MARKED, units_to_wei(payouts[4].amount_units)),
+    ])
+    return {
+        "marked": marked,
+        "settle_ids": [payout.id for payout in payouts[:2]],
+        "settlement": settlement,
+        "ledger_settlement": ledger_settlement,
+        "mark_paid_id": payouts[4].id,
+        "product_id": source.product_id,
+    }
+
+
+def run(client, state: dict, clear_caches) -> list:
+    """Call each budgeted endpoint once; returns (method, route path, response) in call order."""
+    login = {"username": "example", "password": "1234"}
+    splits = [{"wallet_address": "0x" + "11" * 20, "percentage": 60}, {"wallet_address": "0x" + "22" * 20, "percentage": 40}]
+    calls = []
+
+    def call(method: str, route: str, auth: bool = True, path: dict | None = None, **kwargs):
+        clear_caches()
+        headers = {"Authorization": f"Bearer {state['token']}"} if auth else {}
+        response = client.request(method, route.format(**(path or {})), headers=headers, **kwargs)
+        calls.append((method, route, response))
+        return response
+
+    call("POST", "/api/setup", auth=False, json={
+        "username": "budget", "email": "budget@example.com", "password": "pw", "walletAddress": "0x" + "12" * 20,
+    })
+    state["token"] = call("POST", "/api/login", auth=False, json=login).json()["access_token"]
+
+    call("GET", "/api/profile")
+    call("PUT", "/api/profile", json={
+        "username": "example", "email": "example@gmail.com",
+        "wallet_address": "0xB9e367CB4938DC830108aCd66642f2F76fba1393",
+    })
+    call("GET", "/api/dashboard")
+    call("GET", "/api/analytics", params={"granularity": "week", "start": "2020-01-01", "end": "2029-12-31"})
+    call("GET", "/api/products")
+    product_id = call("POST", "/api/add-product", json={
+        "product_name": "Budget", "price": 5, "splits": splits,
+    }).json()["id"]
+    call("PUT", "/api/update-product/{product_id}", path={"product_id": product_id}, json={
+        "product_name": "Budget", "price": 6, "splits": splits[:1] + [
+            {"wallet_address": "0x" + "33" * 20, "percentage": 20}, {"wallet_address": "0x" + "44" * 20, "percentage": 20},
+        ],
+    })
+    call("GET", "/api/store/{unique_slug}", auth=False, path={"unique_slug": "steezed"})
+
+    purchase = call("POST", "/api/make-purchase", auth=False, json={
+        "slug": "steezed", "product_id": state["product_id"], "quantity": 1,
+    }).json()
+    verification_id = call("POST", "/api/confirm-payment", auth=False, json={
+        "transaction_id": purchase["transaction_id"], "tx_hash": f"0x{random.getrandbits(256):064x}",
+    }).json()["verification_id"]
+    call("GET", "/api/confirm-payment/{verification_id}", auth=False, path={"verification_id": verification_id})
+    call("GET", "/api/confirm-payment/stats", auth=False)
+
+    call("GET", "/api/payouts")
+    call("GET", "/api/payouts/ledger")
+    ledger = {"recipient_wallet": RECIPIENT}
+    call("GET", "/api/payouts/ledger/{recipient_wallet}", path=ledger)
+    call("POST", "/api/payouts/{payout_id}/mark-paid", path={"payout_id": state["mark_paid_id"]},
+         json={"tx_hash": state["marked"]})
+    call("POST", "/api/payouts/ledger/{recipient_wallet}/settle", path=ledger,
+         json={"tx_hash": state["ledger_settlement"]})
+    call("POST", "/api/payouts/settle", json={"payout_ids": state["settle_ids"], "tx_hash": state["settlement"]})
+    call("GET", "/api/transactions")
+    call("GET", "/api/transactions/export")
+
+    call("DELETE", "/api/delete-product/{product_id}", path={"product_id": product_id})
+    call("POST", "/api/profile/password", json={"old_password": "1234", "new_password": "12345"})
+    call("DELETE", "/api/delete-account")
+    return calls
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="splitstream_budgets_")
+    chain = StubChain()
+    stub = start_stub(chain)
+
+    # Read by backend.config at import, so set before anything from the app is loaded
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'budgets.db')}",
+        "RPC_URL": f"http://127.0.0.1:{stub.server_address[1]}",
+        "QUERY_TRACE": "1",
+        "APP_ENV": "production",
+    })
+    from . import common  # noqa: F401  (chain settings)
+    from fastapi.testclient import TestClient
+    from .. import models
+    from ..api import app
+    from ..cache import storefront_cache
+    from ..database import SessionLocal, engine
+    from ..dependencies import principal_cache
+    from ..querytrace import QueryBudgetExceeded, enforce_query_budgets
+    from ..receipts import receipt_cache
+
+    def clear_caches():
+        principal_cache.clear()
+        storefront_cache.clear()
+        receipt_cache.memory.clear()
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        state = prepare(db, chain)
+    finally:
+        db.close()
+
+    budgeted = {
+        (method, route.path)
+        for route in app.routes
+        if getattr(getattr(route, "endpoint", None), "query_budget", None) is not None
+        for method in route.methods
+    }
+
+    # No lifespan: the verifier, indexer and sweeper stay off and run no statements meanwhile
+    client = TestClient(app)
+    problems = []
+    try:
+        with enforce_query_budgets() as traces:
+            calls = run(client, state, clear_caches)
+    except QueryBudgetExceeded as e:
+        problems.append(f"over budget:\n{e}")
+        traces = []
+    finally:
+        stub.shutdown()
+
+    for trace in traces:
+        print(trace.summary().splitlines()[0])
+    for method, route, response in calls:
+        if response.status_code >= 400:
+            problems.append(f"{method} {route} returned {response.status_code}: {response.text[:120]}")
+    for method, route in sorted(budgeted - {(method, route) for method, route, _ in calls}):
+        problems.append(f"{method} {route} has a budget but is not exercised here")
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print(f"✅ {len(calls)} endpoints within their query budgets.")
+
+
+if __name__ == "__main__":
+    main()
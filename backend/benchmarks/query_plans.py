@@ -0,0 +1,119 @@
+# backend/benchmarks/query_plans.py
+"""
+EXPLAIN QUERY PLAN and timings for each endpoint's queries, with and
+without the model indexes, on a synthetic SQLite dataset.
+
+    python -m backend.benchmarks.query_plans --merchants 50 --sales 200000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+from sqlalchemy import event, text, update
+
+from .common import timed, temp_session, temp_async_session, seed_merchant, add_sales
+from .. import models, stats
+from ..cache import storefront_cache
+from ..imports import Request, Response
+from ..migrations import apply_schema_updates
+from ..splits import generate_payouts
+from ..routers import merchant as merchant_router, products as products_router
+from ..routers import store as store_router, transactions as transactions_router
+
+
+def endpoint_calls(user, db, adb, run):
+    return {
+        "GET /api/dashboard": lambda: run(merchant_router.dashboard(db=adb, current_user=user)),
+        "GET /api/transactions": lambda: run(transactions_router.get_transaction_history(
+            response=Response(), limit=50, cursor=None, start=None, end=None, db=adb, current_user=user
+        )),
+        "GET /api/store/{slug}": lambda: (storefront_cache.clear(), run(store_router.get_store_products(
+            unique_slug=user.unique_slug, request=Request({"type": "http", "headers": []}), db=adb
+        ))),
+        "GET /api/products": lambda: run(products_router.get_products(db=adb, current_user=user)),
+        "GET /api/payouts": lambda: store_router.get_payouts(db=db, current_user=user),
+    }
+
+
+def capture_statements(engines, fn) -> list:
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    try:
+        fn()
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", record)
+    return captured
+
+
+def report(db, adb, run, user, label: str):
+    engine = db.get_bind()
+    engines = (engine, adb.bind.sync_engine)
+    print(f"\n===== {label} =====")
+    for name, call in endpoint_calls(user, db, adb, run).items():
+        db.expire_all()
+        adb.expire_all()
+        statements = capture_statements(engines, call)
+        elapsed = timed(lambda: (db.expire_all(), adb.expire_all(), call()))
+        print(f"\n{name}: {elapsed:.2f} ms, {len(statements)} statements")
+
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                print("  " + " ".join(statement.split())[:140])
+                plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+                for row in plan:
+                    print(f"      {row[-1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--merchants", type=int, default=50)
+    parser.add_argument("--sales", type=int, default=200_000, help="total paid sales across all merchants")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "splitstream_bench_plans.db")
+    db = temp_session(path)
+    engine = db.get_bind()
+
+    merchants = []
+    for i in range(args.merchants):
+        merchant, products = seed_merchant(db, username=f"merchant{i}")
+        add_sales(db, merchant, products, args.sales // args.merchants)
+        merchants.append(merchant)
+
+    # One partner payout per sale, like confirm_payment produces; a third already settled
+    generate_payouts(db, db.query(models.Transactions).yield_per(10_000))
+    db.execute(
+        update(models.PendingPayout).where(models.PendingPayout.id % 3 == 0).values(status="paid")
+    )
+    db.commit()
+    stats.rebuild_stats(db)
+
+    # Start from the indexes the schema had before they were declared on the models
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+    adb = temp_async_session(path)
+    run = asyncio.new_event_loop().run_until_complete
+
+    user = merchants[0]
+    report(db, adb, run, user, "without indexes")
+    apply_schema_updates(engine)
+    report(db, adb, run, user, "with indexes")
+
+    run(adb.close())
+    db.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
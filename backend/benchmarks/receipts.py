@@ -0,0 +1,58 @@
+# backend/benchmarks/receipts.py
+"""
+Repeated transaction+receipt lookups (retries and duplicate confirmations)
+straight to the node against the two-tier receipt cache.
+
+    python -m backend.benchmarks.receipts --hashes 1000 --repeat 3 --latency 0.002
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from .common import temp_session
+from .rpc_stub import StubChain, start_stub
+from ..chain import RPCClient
+from ..receipts import ReceiptCache
+
+
+def run(label: str, lookup, hashes: list, chain: StubChain):
+    chain.requests = 0
+    start = time.perf_counter()
+    for tx_hash in hashes:
+        lookup(tx_hash)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<30} {chain.requests:>6} RPC requests  {elapsed * 1000 / len(hashes):>7.3f} ms/lookup")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hashes", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3, help="lookups per hash")
+    parser.add_argument("--latency", type=float, default=0.002, help="simulated node latency per HTTP request (s)")
+    args = parser.parse_args()
+
+    chain = StubChain(latency=args.latency)
+    hashes = [f"0x{i:064x}" for i in range(1, args.hashes + 1)]
+    for tx_hash in hashes:
+        chain.add_transfer(tx_hash, "0x0", "0x", block=chain.block_number - 100)
+    server = start_stub(chain)
+    client = RPCClient(f"http://127.0.0.1:{server.server_address[1]}")
+
+    db = temp_session(os.path.join(tempfile.gettempdir(), "splitstream_bench_receipts.db"))
+    cache = ReceiptCache(client, db.get_bind(), maxsize=args.hashes)
+    lookups = hashes * args.repeat
+
+    run("node only", client.get_transaction_with_receipt, lookups, chain)
+    run("cache, cold", cache.get_transaction_with_receipt, lookups, chain)
+    run("cache, memory tier", cache.get_transaction_with_receipt, lookups, chain)
+    cache.memory.clear()
+    run("cache, after restart", cache.get_transaction_with_receipt, hashes, chain)
+    print(cache.stats())
+
+    server.shutdown()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# backend/benchmarks/rpc_client.py
+"""
+Throughput of transaction+receipt lookups against a local stand-in RPC node.
+
+    python -m backend.benchmarks.rpc_client --lookups 2000 --threads 16 --latency 0.002
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from . import common  # noqa: F401  (sets chain env defaults)
+from .rpc_stub import StubChain, start_stub
+from ..chain import RPCClient
+
+
+def unpooled_lookup(url: str, tx_hash: str):
+    # What a fresh connection per call costs: two requests, two handshakes
+    for method in ("eth_getTransactionByHash", "eth_getTransactionReceipt"):
+        requests.post(url, json={"jsonrpc": "2.0", "id": 1, "method": method, "params": [tx_hash]}, timeout=10).json()
+
+
+def run(label: str, lookup, hashes: list, threads: int):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lookup, hashes))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(hashes) / elapsed:>9.0f} lookups/s   ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.002, help="simulated server latency per HTTP request (s)")
+    args = parser.parse_args()
+
+    chain = StubChain(latency=args.latency)
+    hashes = [f"0x{i:064x}" for i in range(args.lookups)]
+    for tx_hash in hashes:
+        chain.add_transfer(tx_hash, "0x0", "0x")
+
+    server = start_stub(chain)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    client = RPCClient(url, pool_size=args.threads)
+
+    def pooled_sequential(tx_hash):
+        client.call("eth_getTransactionByHash", [tx_hash])
+        client.call("eth_getTransactionReceipt", [tx_hash])
+
+    run("unpooled, 2 requests", lambda h: unpooled_lookup(url, h), hashes, args.threads)
+    run("pooled, 2 requests", pooled_sequential, hashes, args.threads)
+    run("pooled, 1 batched request", client.get_transaction_with_receipt, hashes, args.threads)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
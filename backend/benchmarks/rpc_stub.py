@@ -0,0 +1,127 @@
+# backend/benchmarks/rpc_stub.py
+"""Local stand-in for an Ethereum JSON-RPC node, for benchmarks."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubChain:
+    """Canned answers for the RPC methods the backend uses."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.transactions = {}
+        self.block_number = 1_000
+        self.fork = 0
+        self.logs = []
+        self.requests = 0
+
+    def add_transfer(self, tx_hash: str, token: str, data: str, block: int | None = None, logs: list | None = None):
+        block_number = hex(block or self.block_number)
+        logs = [
+            {**log, "transactionHash": tx_hash, "blockNumber": block_number, "logIndex": hex(i)}
+            for i, log in enumerate(logs or [])
+        ]
+        self.transactions[tx_hash] = {
+            "hash": tx_hash,
+            "to": token,
+            "input": data,
+            "blockNumber": block_number,
+            "logs": logs,
+        }
+        self.logs.extend(logs)
+
+    def block_hash(self, number: int) -> str:
+        # Bumping self.fork changes every hash, as if the chain had been reorganised
+        return f"0x{self.fork:08x}{number:056x}"
+
+    def get_logs(self, query: dict) -> list:
+        start, end = int(query["fromBlock"], 16), int(query["toBlock"], 16)
+        topics = query.get("topics", [])
+        address = query.get("address")
+
+        def matches(log):
+            if not start <= int(log["blockNumber"], 16) <= end:
+                return False
+            if address and log["address"].lower() != address.lower():
+                return False
+            for wanted, topic in zip(topics, log["topics"]):
+                if wanted is None:
+                    continue
+                if topic not in (wanted if isinstance(wanted, list) else [wanted]):
+                    return False
+            return True
+
+        return [log for log in self.logs if matches(log)]
+
+    def answer(self, method: str, params: list):
+        if method == "eth_getTransactionByHash":
+            return self.transactions.get(params[0])
+        if method == "eth_getTransactionReceipt":
+            tx = self.transactions.get(params[0])
+            if tx is None:
+                return None
+            return {"transactionHash": tx["hash"], "status": "0x1", "blockNumber": tx["blockNumber"], "logs": tx["logs"]}
+        if method == "eth_blockNumber":
+            return hex(self.block_number)
+        if method == "eth_getBlockByNumber":
+            number = int(params[0], 16)
+            return {"number": params[0], "hash": self.block_hash(number)} if number <= self.block_number else None
+        if method == "eth_getLogs":
+            return self.get_logs(params[0])
+        if method == "eth_chainId":
+            return "0x1"
+        raise ValueError(f"Unsupported method {method}")
+
+
+def transfer_log(token: str, sender: str, recipient: str, value: int) -> dict:
+    """Raw ERC-20 Transfer log as a node returns it."""
+    from ..chain import TRANSFER_TOPIC
+
+    return {
+        "address": token,
+        "topics": [TRANSFER_TOPIC, "0x" + sender[2:].lower().rjust(64, "0"), "0x" + recipient[2:].lower().rjust(64, "0")],
+        "data": hex(value),
+    }
+
+
+def _handler(chain: StubChain):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like a real node
+        disable_nagle_algorithm = True
+        wbufsize = 64 * 1024  # headers and body leave in one segment
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            chain.requests += 1
+            if chain.latency:
+                time.sleep(chain.latency)
+
+            requests = body if isinstance(body, list) else [body]
+            replies = []
+            for request in requests:
+                try:
+                    replies.append({"jsonrpc": "2.0", "id": request["id"], "result": chain.answer(request["method"], request["params"])})
+                except ValueError as e:
+                    replies.append({"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": str(e)}})
+
+            payload = json.dumps(replies if isinstance(body, list) else replies[0]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_stub(chain: StubChain, port: int = 0) -> ThreadingHTTPServer:
+    """Serve the stub chain on a background thread; returns the running server."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(chain))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
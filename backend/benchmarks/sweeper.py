@@ -0,0 +1,122 @@
+# backend/benchmarks/sweeper.py
+"""
+Expiring a backlog of abandoned checkouts while checkouts keep arriving:
+one transaction for the whole backlog against bounded batches, with the
+latency of concurrent purchase inserts measured during each sweep.
+
+    python -m backend.benchmarks.sweeper --stale 100000 --batch 500
+
+Before timing anything it checks that the highest-id purchase is not
+expired until a newer checkout exists (SQLite reuses a deleted max id),
+and exits non-zero if it is.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from datetime import datetime, timedelta
+
+from .common import percentile, temp_session, seed_merchant, add_sales
+from .. import models
+from ..sweeper import PendingSweeper
+
+
+def checkouts(factory, merchant_id: int, product_id: int, done: threading.Event, latencies: list, failures: list):
+    # What /api/make-purchase writes, one commit per purchase
+    db = factory()
+    try:
+        while not done.is_set():
+            start = time.perf_counter()
+            try:
+                db.add(models.Transactions(merchant_id=merchant_id, product_id=product_id,
+                                           quantity=1, amount=50, status="pending"))
+                db.commit()
+            except OperationalError:
+                # "database is locked": the checkout waited out the busy timeout
+                db.rollback()
+                failures.append(time.perf_counter() - start)
+                continue
+            latencies.append(time.perf_counter() - start)
+    finally:
+        db.close()
+
+
+def check_ids_not_reused(path: str) -> list:
+    """Expire the max-id purchase only once a newer checkout exists, so its id is never handed out again."""
+    db = temp_session(path)
+    merchant, products = seed_merchant(db)
+    factory = sessionmaker(bind=db.get_bind())
+    stale = datetime.utcnow() - timedelta(hours=48)
+
+    ids, reports = [], []
+    for created_at in (stale, datetime.utcnow(), datetime.utcnow()):
+        purchase = models.Transactions(merchant_id=merchant.id, product_id=products[0].id,
+                                       quantity=1, amount=50, status="pending", created_at=created_at)
+        db.add(purchase)
+        db.commit()
+        ids.append(purchase.id)
+        reports.append(PendingSweeper(factory, ttl_hours=24).run_once())
+
+    archived = db.query(models.ArchivedTransaction.original_id).all()
+    db.close()
+
+    problems = []
+    if [report["expired"] for report in reports] != [0, 1, 0]:
+        problems.append(f"expired per sweep {[report['expired'] for report in reports]}, expected [0, 1, 0]")
+    if [row.original_id for row in archived] != ids[:1]:
+        problems.append(f"archived ids {[row.original_id for row in archived]}, expected {ids[:1]}")
+    if sorted(set(ids)) != ids:
+        problems.append(f"transaction ids {ids} reused or out of order")
+    return problems
+
+
+def run(label: str, path: str, args, batch_size: int):
+    db = temp_session(path)
+    merchant, products = seed_merchant(db)
+    add_sales(db, merchant, products, args.paid)
+    add_sales(db, merchant, products, args.stale, status="pending")
+    factory = sessionmaker(bind=db.get_bind())
+
+    done, latencies, failures = threading.Event(), [], []
+    writer = threading.Thread(target=checkouts, args=(factory, merchant.id, products[0].id, done, latencies, failures))
+    writer.start()
+    time.sleep(0.2)
+
+    report = PendingSweeper(factory, ttl_hours=24, batch_size=batch_size).run_once()
+    done.set()
+    writer.join()
+
+    remaining = db.query(func.count(models.Transactions.id)).scalar()
+    print(f"{label:<22} expired {report['expired']:>7} in {report['batches']:>4} batches  {report['seconds']:>6.2f}s   "
+          f"checkout p99 {percentile(latencies, 0.99):>7.1f} ms  max {max(latencies) * 1000:>7.1f} ms  "
+          f"{len(failures)} timed out   {remaining} rows left")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paid", type=int, default=50_000, help="paid sales kept in transactions")
+    parser.add_argument("--stale", type=int, default=100_000, help="abandoned pending purchases to expire")
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "splitstream_bench_sweeper.db")
+    problems = check_ids_not_reused(path)
+    if problems:
+        print("❌ Transaction ids: " + "; ".join(problems))
+        sys.exit(1)
+    print("✅ The newest purchase is kept until a newer one exists; expired ids are not reused.")
+
+    run("one transaction", path, args, batch_size=args.stale)
+    run(f"batches of {args.batch}", path, args, batch_size=args.batch)
+
+
+if __name__ == "__main__":
+    main()
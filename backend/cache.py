@@ -0,0 +1,76 @@
+# backend/cache.py
+import threading
+import time
+from collections import OrderedDict
+
+from .config import STOREFRONT_CACHE_SIZE, STOREFRONT_CACHE_TTL
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping with an optional per-entry TTL."""
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation: int | None = None, ttl: float | None = None):
+        """Store value; skipped if the cache was invalidated since `generation` was read."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            ttl = ttl if ttl is not None else self.ttl
+            expires_at = time.monotonic() + ttl if ttl else None
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def generation(self) -> int:
+        """Token to pass to set() so a load that raced an invalidation is not cached."""
+        with self._lock:
+            return self._generation
+
+    def pop(self, key):
+        with self._lock:
+            self._generation += 1
+            entry = self._data.pop(key, None)
+            return entry[0] if entry else None
+
+    def discard_where(self, predicate):
+        """Drop every entry whose value matches predicate(value)."""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k, (value, _) in self._data.items() if predicate(value)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Rendered storefront responses keyed by merchant slug: (body bytes, etag)
+storefront_cache = LRUCache(STOREFRONT_CACHE_SIZE, ttl=STOREFRONT_CACHE_TTL)
+
+
+def invalidate_storefront(slug: str):
+    """Drop a merchant's cached storefront after its catalog or profile changes."""
+    storefront_cache.pop(slug)
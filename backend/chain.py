@@ -0,0 +1,144 @@
+# backend/chain.py
+import itertools
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from .imports import os, Web3, load_dotenv
+from .metrics import observe_rpc
+
+load_dotenv()
+
+
+# ------------------------------
+# Chain configuration
+# ------------------------------
+
+RPC_URL = os.getenv("RPC_URL")
+if not RPC_URL:
+    print("RPC is invalid")
+
+MNEE_TOKEN_ADDRESS = os.getenv("MNEE_TOKEN_ADDRESS")
+if not MNEE_TOKEN_ADDRESS:
+    print("MNEE Token not gotten")
+
+CHAIN_ID = os.getenv("CHAIN_ID")
+if not CHAIN_ID:
+    print("Chain ID hasn't been gotten")
+
+# Keep-alive connections held open to the RPC node, shared by every chain call.
+RPC_POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "20"))
+# Default seconds to wait on a single RPC request; callers can override per call.
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "10"))
+
+
+class RPCError(Exception):
+    """Raised when the RPC node returns an error or cannot be reached."""
+
+
+class RPCClient:
+    """JSON-RPC client over a pooled keep-alive HTTP session."""
+
+    def __init__(self, url: str, pool_size: int = RPC_POOL_SIZE, timeout: float = RPC_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._ids = itertools.count(1)
+
+    def call(self, method: str, params: list, timeout: float | None = None):
+        """Send a single JSON-RPC request and return its result."""
+        return self.batch([(method, params)], timeout=timeout)[0]
+
+    def batch(self, calls: list, timeout: float | None = None) -> list:
+        """Send several (method, params) calls in one HTTP request, results in call order."""
+        label = "+".join(sorted({method for method, _ in calls}))
+        start = time.perf_counter()
+        try:
+            results = self._batch(calls, timeout)
+        except RPCError:
+            observe_rpc(label, time.perf_counter() - start, failed=True)
+            raise
+        observe_rpc(label, time.perf_counter() - start)
+        return results
+
+    def _batch(self, calls: list, timeout: float | None) -> list:
+        payload = [
+            {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+            for method, params in calls
+        ]
+
+        try:
+            response = self.session.post(self.url, json=payload, timeout=timeout or self.timeout)
+            response.raise_for_status()
+            replies = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise RPCError(f"RPC request failed: {e}") from e
+
+        if isinstance(replies, dict):
+            # Some nodes answer a rejected batch with a single error object
+            raise RPCError(replies.get("error", {}).get("message", "Malformed RPC response"))
+
+        by_id = {reply.get("id"): reply for reply in replies}
+        results = []
+        for request in payload:
+            reply = by_id.get(request["id"])
+            if reply is None:
+                raise RPCError(f"No response for {request['method']}")
+            if "error" in reply:
+                raise RPCError(f"{request['method']}: {reply['error'].get('message')}")
+            results.append(reply.get("result"))
+        return results
+
+    def get_transaction_with_receipt(self, tx_hash: str, timeout: float | None = None) -> tuple:
+        """Fetch a transaction and its receipt in a single round-trip."""
+        tx, receipt = self.batch(
+            [
+                ("eth_getTransactionByHash", [tx_hash]),
+                ("eth_getTransactionReceipt", [tx_hash]),
+            ],
+            timeout=timeout,
+        )
+        return tx, receipt
+
+
+rpc = RPCClient(RPC_URL)
+w3 = Web3(Web3.HTTPProvider(RPC_URL, request_kwargs={"timeout": RPC_TIMEOUT}, session=rpc.session))
+MNEE_TOKEN = Web3.to_checksum_address(MNEE_TOKEN_ADDRESS)
+CHAIN_ID = int(CHAIN_ID)
+
+ERC20_ABI = [
+    {
+        "constant": False,
+        "inputs": [
+            {"name": "_to", "type": "address"},
+            {"name": "_value", "type": "uint256"},
+        ],
+        "name": "transfer",
+        "outputs": [{"name": "", "type": "bool"}],
+        "type": "function",
+    }
+]
+
+token_contract = w3.eth.contract(address=MNEE_TOKEN, abi=ERC20_ABI)
+
+# keccak("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0x" + Web3.keccak(text="Transfer(address,address,uint256)").hex().removeprefix("0x")
+
+
+def decode_transfer_logs(receipt: dict, token: str = MNEE_TOKEN) -> list:
+    """(sender, recipient, value) for every ERC-20 Transfer of `token` in a raw receipt."""
+    transfers = []
+    for log in receipt.get("logs", []):
+        topics = log.get("topics", [])
+        if len(topics) != 3 or topics[0].lower() != TRANSFER_TOPIC:
+            continue
+        if log["address"].lower() != token.lower():
+            continue
+        transfers.append((
+            "0x" + topics[1][-40:].lower(),
+            "0x" + topics[2][-40:].lower(),
+            int(log["data"], 16),
+        ))
+    return transfers
@@ -1,8 +1,16 @@
 # backend/config.py
+import gzip
+import hashlib
+import json
 import os
 import subprocess
 from dotenv import load_dotenv
 
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
 load_dotenv()
 
 
@@ -14,36 +22,102 @@ BASE_DIR = os.path.dirname(__file__)
 FRONTEND_DIR = os.path.join(BASE_DIR, "../frontend")
 SRC_DIR = os.path.join(FRONTEND_DIR, "src")
 DIST_DIR = os.path.join(FRONTEND_DIR, "dist")
+ASSETS_DIR = os.path.join(DIST_DIR, "assets")
+
+
+# "production" trusts the deployed dist/ and skips the frontend check at startup.
+APP_ENV = os.getenv("APP_ENV", "development")
+
+# Written next to the bundle after each build: content hashes of the inputs it was built from.
+BUILD_MANIFEST = os.path.join(DIST_DIR, ".build-manifest.json")
+
+# Files and folders under frontend/ that feed `npm run build`
+BUILD_INPUTS = (
+    "src", "public", "index.html", "package.json", "package-lock.json",
+    "vite.config.ts", "tsconfig.json", "tsconfig.app.json", "tsconfig.node.json",
+)
+
+
+def source_hashes() -> dict:
+    """sha256 of every build input, keyed by its path relative to frontend/."""
+    files = []
+    for entry in BUILD_INPUTS:
+        path = os.path.join(FRONTEND_DIR, entry)
+        if os.path.isfile(path):
+            files.append(path)
+        for root, _, names in os.walk(path):
+            files.extend(os.path.join(root, name) for name in names)
 
+    hashes = {}
+    for file in files:
+        with open(file, "rb") as f:
+            hashes[os.path.relpath(file, FRONTEND_DIR)] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
 
-def latest_modified_time(path: str) -> float:
-    """Recursively find the latest modification time in a directory."""
-    latest_time = 0.0
-    for root, _, files in os.walk(path):
-        for f in files:
-            try:
-                latest_time = max(latest_time, os.path.getmtime(os.path.join(root, f)))
-            except FileNotFoundError:
+
+# Text assets worth precompressing; images and fonts are already compressed
+COMPRESSIBLE_EXTENSIONS = (".js", ".css", ".html", ".svg", ".json", ".map", ".txt", ".wasm")
+COMPRESS_MIN_BYTES = 1024
+
+
+def precompress_assets(directory: str = ASSETS_DIR) -> int:
+    """Write .gz (and .br when brotli is installed) next to each text asset; returns files written."""
+    written = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS) or os.path.getsize(path) < COMPRESS_MIN_BYTES:
                 continue
-    return latest_time
+            with open(path, "rb") as f:
+                data = f.read()
+
+            variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants[".br"] = brotli.compress(data, quality=11)
+
+            for suffix, compressed in variants.items():
+                if len(compressed) < len(data):
+                    with open(path + suffix, "wb") as f:
+                        f.write(compressed)
+                    written += 1
+
+    if brotli is None:
+        print("⚠️ brotli is not installed; only gzip variants were written.")
+    return written
+
+
+def write_build_manifest():
+    """Record the inputs of the bundle currently in dist/."""
+    with open(BUILD_MANIFEST, "w") as f:
+        json.dump({"inputs": source_hashes()}, f, indent=2, sort_keys=True)
 
 
 def frontend_needs_rebuild() -> bool:
-    """Return True if src files are newer than dist files or dist is missing."""
-    if not os.path.exists(DIST_DIR) or not os.listdir(DIST_DIR):
-        return True  # dist missing or empty
+    """Return True if dist is missing or any build input changed since the manifest was written."""
+    if not os.path.exists(os.path.join(DIST_DIR, "index.html")):
+        return True
+
+    try:
+        with open(BUILD_MANIFEST) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return True  # built by hand or by an older version
 
-    src_time = latest_modified_time(SRC_DIR)
-    dist_time = latest_modified_time(DIST_DIR)
-    return src_time > dist_time
+    return manifest.get("inputs") != source_hashes()
 
 
 def build_frontend():
     """Build frontend if it’s outdated."""
+    if APP_ENV == "production":
+        # The deploy builds the bundle (build.sh); workers never rebuild or hash sources
+        return
+
     try:
         if frontend_needs_rebuild():
             print("⚙️  Detected frontend changes — rebuilding...")
             subprocess.run("npm run build", cwd=FRONTEND_DIR, shell=True, check=True)
+            precompress_assets()
+            write_build_manifest()
             print("✅ Frontend rebuilt successfully.")
         else:
             print("✅ Frontend is up to date.")
@@ -54,3 +128,118 @@ def build_frontend():
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "hii")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+
+
+# ------------------------------
+# Database
+# ------------------------------
+
+# SQLAlchemy URL; anything other than sqlite:// is treated as a pooled server database.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./users.db")
+
+# SQLite connection pragmas. WAL lets readers proceed while a commit is being written.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# Milliseconds a writer waits on a locked database before raising "database is locked".
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Page cache per connection, in KiB.
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+
+# Connection pool for server databases (Postgres, MySQL).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+# Seconds after which a pooled connection is replaced, below typical server idle timeouts.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+# ------------------------------
+# Payment verification
+# ------------------------------
+
+# Number of background threads pulling confirmations off the verification queue.
+VERIFIER_WORKERS = int(os.getenv("VERIFIER_WORKERS", "4"))
+# Seconds after which a job left 'verifying' (its process died) may be claimed again; well above RPC_TIMEOUT.
+VERIFIER_STALE_SECONDS = float(os.getenv("VERIFIER_STALE_SECONDS", "300"))
+
+# Seconds a background job's lease lasts without renewal. The indexer and the sweeper may be
+# enabled in every worker process; a lease row in worker_leases lets only one of them run at a
+# time, and another worker takes over this long after the holder dies.
+WORKER_LEASE_SECONDS = float(os.getenv("WORKER_LEASE_SECONDS", "60"))
+
+# Confirm pending purchases in the background from MNEE Transfer logs (one worker at a time, see above).
+INDEXER_ENABLED = os.getenv("INDEXER_ENABLED", "1") == "1"
+# Seconds between scans once the indexer has caught up with the chain.
+INDEXER_POLL_SECONDS = float(os.getenv("INDEXER_POLL_SECONDS", "5"))
+# Blocks per eth_getLogs range; hosted nodes commonly cap ranges somewhere between 1k and 10k.
+INDEXER_CHUNK_BLOCKS = int(os.getenv("INDEXER_CHUNK_BLOCKS", "2000"))
+# Blocks a transfer must be buried under before it confirms a purchase; also how far to rewind after a reorg.
+INDEXER_REORG_DEPTH = int(os.getenv("INDEXER_REORG_DEPTH", "12"))
+# First block to scan on a fresh database. Unset starts from the current confirmed head.
+INDEXER_START_BLOCK = int(os.environ["INDEXER_START_BLOCK"]) if os.getenv("INDEXER_START_BLOCK") else None
+
+# Move abandoned checkouts out of the transactions table in the background (one worker at a time).
+SWEEPER_ENABLED = os.getenv("SWEEPER_ENABLED", "1") == "1"
+# Hours a purchase may stay pending before it is expired and archived.
+PENDING_TTL_HOURS = float(os.getenv("PENDING_TTL_HOURS", "24"))
+# Seconds between sweeps.
+SWEEP_INTERVAL_SECONDS = float(os.getenv("SWEEP_INTERVAL_SECONDS", "300"))
+# Rows moved per transaction, so checkouts and confirmations are never locked out for long.
+SWEEP_BATCH_SIZE = int(os.getenv("SWEEP_BATCH_SIZE", "500"))
+
+
+# ------------------------------
+# Caching
+# ------------------------------
+
+# Storefronts kept rendered in memory, least recently used evicted first.
+STOREFRONT_CACHE_SIZE = int(os.getenv("STOREFRONT_CACHE_SIZE", "1024"))
+# Upper bound on how stale another worker's copy can be after an invalidation.
+STOREFRONT_CACHE_TTL = float(os.getenv("STOREFRONT_CACHE_TTL", "30"))
+
+# Compiled revenue-split plans kept in memory; each is checked against the product's splits version before use.
+SPLIT_PLAN_CACHE_SIZE = int(os.getenv("SPLIT_PLAN_CACHE_SIZE", "10000"))
+
+# Seconds browsers may reuse index.html before revalidating it with its ETag.
+SHELL_MAX_AGE = int(os.getenv("SHELL_MAX_AGE", "60"))
+
+# Finalized transactions and receipts kept in memory in front of the chain_records table.
+CHAIN_CACHE_SIZE = int(os.getenv("CHAIN_CACHE_SIZE", "10000"))
+# Blocks a transaction must be buried under before its data is cached; shallower blocks can still be reorganised.
+CHAIN_CACHE_CONFIRMATIONS = int(os.getenv("CHAIN_CACHE_CONFIRMATIONS", str(INDEXER_REORG_DEPTH)))
+
+# Resolved bearer tokens kept so authenticated requests skip JWT decoding and the user lookup.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+# Seconds a resolved principal is trusted before the token is checked again. The cache is per
+# process, so other workers may serve a changed account this long; password checks and
+# account changes always read the user from the database.
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+
+# ------------------------------
+# Query tracing
+# ------------------------------
+
+# Count SQL statements per request and warn about likely N+1s; on by default outside production.
+QUERY_TRACE = os.getenv("QUERY_TRACE", "0" if APP_ENV == "production" else "1") == "1"
+# Times one statement shape may run in a request before it is reported as a likely N+1.
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+
+
+# ------------------------------
+# Password hashing
+# ------------------------------
+
+# bcrypt cost factor; stored hashes with a different cost are rehashed on login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Worker processes doing bcrypt work. 0 hashes inline on the request thread.
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", "2"))
+# Password jobs allowed to wait for a worker before requests are turned away with 503.
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "32"))
+
+
+if __name__ == "__main__":
+    # Run after `npm run build` so production workers can trust dist/
+    compressed = precompress_assets()
+    write_build_manifest()
+    print(f"✅ Wrote {compressed} compressed assets and {BUILD_MANIFEST}")
@@ -1,14 +1,78 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./users.db"
+from .metrics import instrument_engine
+from .querytrace import trace_engine
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+from .config import (
+    DATABASE_URL, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE
 )
 
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+
+# Applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "cache_size": -SQLITE_CACHE_SIZE_KB,  # negative means KiB rather than pages
+}
+
+# Async drivers for the same database: aiosqlite for SQLite, asyncpg for Postgres
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_database_url(url: str):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def _apply_pragmas(pragmas: dict):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return on_connect
+
+
+def create_db_engine(url: str = DATABASE_URL, asynchronous: bool = False, pragmas: dict | None = None):
+    """Engine for url: SQLite gets the connection pragmas, server databases a sized, pre-pinged pool."""
+    url = async_database_url(url) if asynchronous else make_url(url)
+    factory = create_async_engine if asynchronous else create_engine
+
+    if url.get_backend_name() == "sqlite":
+        connect_args = {} if asynchronous else {"check_same_thread": False}
+        engine = factory(url, connect_args=connect_args)
+        sync_engine = engine.sync_engine if asynchronous else engine
+        event.listen(sync_engine, "connect", _apply_pragmas(SQLITE_PRAGMAS if pragmas is None else pragmas))
+        return engine
+
+    return factory(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+# Read-heavy routes run on the event loop instead of the threadpool
+async_engine = create_db_engine(SQLALCHEMY_DATABASE_URL, asynchronous=True)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
+for _engine in (engine, async_engine.sync_engine):
+    instrument_engine(_engine)
+    trace_engine(_engine)
+
+Base = declarative_base()
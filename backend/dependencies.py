@@ -1,14 +1,19 @@
 from .imports import (
-    HTTPException, Session, Depends, status, jwt, 
+    HTTPException, Session, AsyncSession, Depends, status, jwt, select,
     ExpiredSignatureError, JWTError, OAuth2PasswordBearer,
-    HTTPBearer, CryptContext, timedelta, datetime, string, secrets
+    HTTPBearer, timedelta, datetime, string, secrets
 )
+import time
+from sqlalchemy.orm import make_transient_to_detached
 from . import models
-from .database import SessionLocal
-from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from .cache import LRUCache
+from .database import SessionLocal, AsyncSessionLocal
+from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL
 
 oauth2_scheme = HTTPBearer()
-pwd_cxt = CryptContext(schemes=['bcrypt'], deprecated="auto")
+
+# Bearer token -> (subject, detached User snapshot)
+principal_cache = LRUCache(PRINCIPAL_CACHE_SIZE)
 
 def get_db():
     db = SessionLocal()
@@ -17,6 +22,10 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     """Generate a JWT token."""
     to_encode = data.copy()
@@ -25,15 +34,20 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def _decode_token(credentials: str) -> dict:
+    """Validated JWT payload; raises 401 if the token is expired, invalid or has no subject."""
+    credentials_exception = _credentials_exception()
+
     try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM]) 
+        payload = jwt.decode(credentials, SECRET_KEY, algorithms=[ALGORITHM]) 
         username: str = payload.get("sub")
         
         if username is None:
@@ -48,13 +62,76 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.username == username).first()
+    return payload
+
+
+def _cache_principal(credentials: str, payload: dict, user: models.User):
+    # Never trust the cached principal beyond the token's own expiry
+    ttl = min(PRINCIPAL_CACHE_TTL, payload["exp"] - time.time()) if "exp" in payload else PRINCIPAL_CACHE_TTL
+    if ttl > 0:
+        principal_cache.set(credentials, (payload["sub"], _snapshot(user)), ttl=ttl)
+
+
+def _load_principal(credentials: str, db: Session) -> models.User:
+    payload = _decode_token(credentials)
+    user = db.query(models.User).filter(models.User.username == payload["sub"]).first()
     
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
 
+    _cache_principal(credentials, payload, user)
     return user
 
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    cached = principal_cache.get(token.credentials)
+    if cached is not None:
+        # Attach a copy of the snapshot to this request's session without a SELECT
+        _, snapshot = cached
+        return db.merge(snapshot, load=False)
+
+    return _load_principal(token.credentials, db)
+
+
+def get_current_user_fresh(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """get_current_user read from the database, for password checks and account changes.
+
+    The principal cache is per process: another worker may still hold a
+    snapshot from before a password, wallet or account change.
+    """
+    return _load_principal(token.credentials, db)
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """get_current_user for async routes; shares the principal cache."""
+    cached = principal_cache.get(token.credentials)
+    if cached is not None:
+        _, snapshot = cached
+        return await db.merge(snapshot, load=False)
+
+    payload = _decode_token(token.credentials)
+    user = await db.scalar(select(models.User).where(models.User.username == payload["sub"]))
+
+    if user is None:
+        raise _credentials_exception()
+
+    _cache_principal(token.credentials, payload, user)
+    return user
+
+
+def _snapshot(user: models.User) -> models.User:
+    """Detached copy of the user's columns, safe to share across sessions."""
+    copy = models.User(**{
+        column.key: getattr(user, column.key) for column in models.User.__table__.columns
+    })
+    make_transient_to_detached(copy)
+    return copy
+
+
+def invalidate_principal(user_id: int):
+    """Forget every cached token of a user after their account changes."""
+    principal_cache.discard_where(lambda entry: entry[1].id == user_id)
+
 def generate_unique_slug(db: Session, length: int = 8) -> str:
     alphabet = string.ascii_lowercase + string.digits
     while True:
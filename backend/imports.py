@@ -1,17 +1,20 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Security, APIRouter, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Security, APIRouter, Request, Query, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from passlib.context import CryptContext
 import os
 from jose import jwt, JWTError, ExpiredSignatureError
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from fastapi.middleware.cors import CORSMiddleware
 import uuid
 import random
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import func, select, insert
 from typing import List
 import secrets
 import string
@@ -0,0 +1,283 @@
+# backend/indexer.py
+"""
+Background indexer that confirms purchases from on-chain Transfer logs.
+
+Rather than a transaction and receipt lookup per purchase, the indexer
+pulls MNEE Transfer logs sent to merchants with pending purchases, using
+eth_getLogs over block ranges, and pairs each transfer with the oldest
+pending purchase for the same recipient and amount.
+
+Only blocks INDEXER_REORG_DEPTH behind the head are scanned. The last
+scanned block and its hash are checkpointed in the same commit as the
+purchases it confirmed; if that block is later replaced, the indexer
+rewinds INDEXER_REORG_DEPTH blocks and scans them again.
+
+Each pass holds the transfer-indexer lease (see leases.py), so with
+several worker processes only one scans and owns the checkpoint.
+
+    python -m backend.indexer           # one catch-up pass
+    python -m backend.indexer status
+"""
+import sys
+import threading
+from collections import defaultdict, deque
+
+from sqlalchemy import update
+
+from .imports import Session
+from . import models, stats
+from .chain import MNEE_TOKEN, TRANSFER_TOPIC, RPCError, decode_transfer_logs, rpc
+from .config import (
+    INDEXER_CHUNK_BLOCKS, INDEXER_POLL_SECONDS, INDEXER_REORG_DEPTH, INDEXER_START_BLOCK
+)
+from .database import SessionLocal
+from .leases import Lease
+from .splits import generate_payouts, to_units, units_to_wei
+
+CHECKPOINT = "mnee_transfers"
+# Recipients per eth_getLogs filter; nodes cap the size of topic OR-lists
+WALLETS_PER_FILTER = 200
+
+
+def _address_topic(wallet: str) -> str:
+    return "0x" + wallet[2:].lower().rjust(64, "0")
+
+
+class TransferIndexer:
+    """Scans Transfer logs on a background thread and confirms matching purchases."""
+
+    def __init__(self, client=rpc, session_factory=SessionLocal, chunk_blocks: int = INDEXER_CHUNK_BLOCKS,
+                 reorg_depth: int = INDEXER_REORG_DEPTH, poll_seconds: float = INDEXER_POLL_SECONDS,
+                 lease: Lease | None = None):
+        self.rpc = client
+        self.lease = lease
+        self.session_factory = session_factory
+        self.chunk_blocks = chunk_blocks
+        self.reorg_depth = reorg_depth
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._head = None
+        self._checkpoint = None
+        self._scans = 0
+        self._transfers = 0
+        self._confirmed = 0
+        self._reorgs = 0
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="transfer-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join(timeout=30)
+        self._thread = None
+        if self.lease is not None:
+            self.lease.release()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except RPCError as e:
+                print(f"⚠️ Transfer indexer: {e}")
+            except Exception as e:
+                print(f"❌ Transfer indexer error: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def run_once(self) -> int:
+        """Scan every block down to the confirmation depth; returns the number of purchases confirmed.
+
+        Does nothing while another process holds the lease.
+        """
+        if not self._holds_lease():
+            return 0
+
+        db = self.session_factory()
+        try:
+            checkpoint = db.get(models.IndexerCheckpoint, CHECKPOINT)
+
+            calls = [("eth_blockNumber", [])]
+            if checkpoint is not None and checkpoint.block_hash:
+                calls.append(("eth_getBlockByNumber", [hex(checkpoint.block_number), False]))
+            head, *block = self.rpc.batch(calls)
+            safe_head = int(head, 16) - self.reorg_depth
+
+            if checkpoint is None:
+                start = INDEXER_START_BLOCK if INDEXER_START_BLOCK is not None else safe_head
+                checkpoint = models.IndexerCheckpoint(name=CHECKPOINT, block_number=start - 1)
+                db.add(checkpoint)
+                db.commit()
+            elif block and (block[0] is None or block[0]["hash"] != checkpoint.block_hash):
+                # The checkpoint block is no longer canonical: rescan the blocks that may have changed
+                print(f"⚠️ Block {checkpoint.block_number} was reorganised; rescanning {self.reorg_depth} blocks")
+                checkpoint.block_number = max(checkpoint.block_number - self.reorg_depth, 0)
+                checkpoint.block_hash = None
+                db.commit()
+                with self._lock:
+                    self._reorgs += 1
+
+            with self._lock:
+                self._head = int(head, 16)
+                self._checkpoint = checkpoint.block_number
+
+            confirmed = 0
+            while checkpoint.block_number < safe_head and not self._stop.is_set() and self._holds_lease():
+                start = checkpoint.block_number + 1
+                confirmed += self._scan(db, checkpoint, start, min(start + self.chunk_blocks - 1, safe_head))
+            return confirmed
+        finally:
+            db.close()
+
+    def _holds_lease(self) -> bool:
+        # Renewed before every chunk, so a long catch-up never outlives the lease
+        return self.lease is None or self.lease.acquire()
+
+    def _scan(self, db: Session, checkpoint: models.IndexerCheckpoint, start: int, end: int) -> int:
+        """Scan one block range and commit its matches together with the new checkpoint."""
+        wallets = self._pending_merchant_wallets(db)
+
+        calls = [("eth_getBlockByNumber", [hex(end), False])]
+        recipients = sorted(wallets)
+        for i in range(0, len(recipients), WALLETS_PER_FILTER):
+            calls.append(("eth_getLogs", [{
+                "fromBlock": hex(start),
+                "toBlock": hex(end),
+                "address": MNEE_TOKEN,
+                "topics": [TRANSFER_TOPIC, None, [_address_topic(w) for w in recipients[i:i + WALLETS_PER_FILTER]]],
+            }]))
+        block, *pages = self.rpc.batch(calls)
+        if block is None:
+            raise RPCError(f"Block {end} not found")
+
+        logs = [log for page in pages for log in page]
+        confirmed = self._confirm(db, wallets, logs) if logs else 0
+
+        checkpoint.block_number = end
+        checkpoint.block_hash = block["hash"]
+        db.commit()
+
+        with self._lock:
+            self._checkpoint = end
+            self._scans += 1
+            self._transfers += len(logs)
+            self._confirmed += confirmed
+        return confirmed
+
+    def _pending_merchant_wallets(self, db: Session) -> dict:
+        """Lower-cased wallet -> ids of merchants with pending purchases paid to it."""
+        pending_merchants = db.query(models.Transactions.merchant_id).filter(
+            models.Transactions.status == "pending"
+        ).distinct()
+        wallets = defaultdict(list)
+        for merchant_id, wallet in db.query(models.User.id, models.User.wallet_address).filter(
+            models.User.id.in_(pending_merchants)
+        ):
+            wallets[wallet.lower()].append(merchant_id)
+        return wallets
+
+    def _confirm(self, db: Session, wallets: dict, logs: list) -> int:
+        """Pair transfers with pending purchases, oldest purchase first; returns how many were confirmed."""
+        transfers = []
+        for log in sorted(logs, key=lambda log: (int(log["blockNumber"], 16), int(log["logIndex"], 16))):
+            if log.get("removed"):
+                continue
+            for _, recipient, value in decode_transfer_logs({"logs": [log]}):
+                transfers.append((log["transactionHash"].lower(), recipient, value))
+        if not transfers:
+            return 0
+
+        # A transaction hash pays for at most one purchase, however it was confirmed
+        used = {
+            tx_hash for (tx_hash,) in db.query(models.Transactions.tx_hash).filter(
+                models.Transactions.tx_hash.in_({tx_hash for tx_hash, _, _ in transfers})
+            )
+        }
+
+        merchant_ids = {mid for _, recipient, _ in transfers for mid in wallets.get(recipient, ())}
+        wallet_of = {mid: wallet for wallet, ids in wallets.items() for mid in ids}
+        candidates = defaultdict(deque)
+        for transaction in db.query(models.Transactions).filter(
+            models.Transactions.status == "pending",
+            models.Transactions.merchant_id.in_(merchant_ids),
+        ).order_by(models.Transactions.created_at, models.Transactions.id):
+            key = (wallet_of[transaction.merchant_id], units_to_wei(to_units(transaction.amount)))
+            candidates[key].append(transaction)
+
+        matched = []
+        for tx_hash, recipient, value in transfers:
+            queue = candidates.get((recipient, value))
+            if tx_hash in used or not queue:
+                continue
+            transaction = queue.popleft()
+            # Compare-and-set, in case a buyer claimed this purchase meanwhile. If a buyer claimed
+            # this hash for another purchase, the unique index fails the range and the next
+            # pass sees the hash as used.
+            claimed = db.execute(
+                update(models.Transactions)
+                .where(models.Transactions.id == transaction.id, models.Transactions.status == "pending")
+                .values(status="paid", tx_hash=tx_hash)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if claimed:
+                used.add(tx_hash)
+                matched.append(transaction)
+
+        if matched:
+            generate_payouts(db, matched)
+            stats.record_sales(db, matched)
+        return len(matched)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "lease_held": self.lease is None or self.lease.held,
+                "head_block": self._head,
+                "checkpoint_block": self._checkpoint,
+                "lag_blocks": None if self._head is None or self._checkpoint is None
+                else max(self._head - self.reorg_depth - self._checkpoint, 0),
+                "scans": self._scans,
+                "transfers_seen": self._transfers,
+                "confirmed": self._confirmed,
+                "reorgs": self._reorgs,
+            }
+
+
+indexer = TransferIndexer(lease=Lease("transfer-indexer"))
+
+
+if __name__ == "__main__":
+    from .database import engine
+    from .migrations import apply_schema_updates
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "run"
+    models.Base.metadata.create_all(bind=engine)
+    apply_schema_updates(engine)
+    if command == "run":
+        confirmed = indexer.run_once()
+        held = indexer.lease.held
+        indexer.lease.release()
+        if not held:
+            print("⚠️ Another process is running the transfer indexer; nothing scanned.")
+            sys.exit(1)
+        print(f"✅ Indexed up to block {indexer.stats()['checkpoint_block']}; {confirmed} purchases confirmed.")
+    elif command == "status":
+        db = SessionLocal()
+        try:
+            checkpoint = db.get(models.IndexerCheckpoint, CHECKPOINT)
+        finally:
+            db.close()
+        if checkpoint is None:
+            print("Transfer indexer has not run yet.")
+        else:
+            print(f"Last scanned block {checkpoint.block_number} ({checkpoint.block_hash}) at {checkpoint.updated_at}")
+    else:
+        print(__doc__)
+        sys.exit(2)
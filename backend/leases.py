@@ -0,0 +1,75 @@
+# backend/leases.py
+"""
+Database leases that keep a background job to one process at a time.
+
+Every uvicorn worker starts the same background threads. Jobs that must
+not run twice (the transfer indexer, the pending sweeper) take a named
+row in worker_leases before each pass and renew it as they go; the other
+workers find it held and skip their turn. A holder that dies stops
+renewing, and the lease passes to another worker once it expires.
+"""
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import insert, or_, update
+
+from .imports import datetime, IntegrityError
+from . import models
+from .config import WORKER_LEASE_SECONDS
+from .database import SessionLocal
+
+
+class Lease:
+    def __init__(self, name: str, session_factory=SessionLocal, ttl: float = WORKER_LEASE_SECONDS):
+        self.name = name
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.held = False
+
+    def acquire(self) -> bool:
+        """Take the lease if it is free or expired, or extend it if already ours."""
+        lease = models.WorkerLease
+        now = datetime.utcnow()
+        values = {"holder": self.holder, "expires_at": now + timedelta(seconds=self.ttl)}
+
+        db = self.session_factory()
+        try:
+            taken = db.execute(
+                update(lease)
+                .where(lease.name == self.name, or_(lease.holder == self.holder, lease.expires_at < now))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            ).rowcount == 1
+            if not taken and db.get(lease, self.name) is None:
+                try:
+                    db.execute(insert(lease).values(name=self.name, **values))
+                    taken = True
+                except IntegrityError:
+                    db.rollback()  # another process created it first
+            db.commit()
+        finally:
+            db.close()
+
+        self.held = taken
+        return taken
+
+    def release(self):
+        """Let another process take over now rather than after the lease expires."""
+        if not self.held:
+            return
+        lease = models.WorkerLease
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(lease)
+                .where(lease.name == self.name, lease.holder == self.holder)
+                .values(expires_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+        self.held = False
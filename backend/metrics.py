@@ -0,0 +1,135 @@
+# backend/metrics.py
+"""
+Prometheus metrics, served at /metrics.
+
+Request latency by router and route template, SQL statement counts and
+durations from engine events, JSON-RPC call timing, in-flight requests,
+and threadpool / verifier saturation sampled at scrape time. Everything
+on the hot path is a dict lookup and a histogram observe.
+"""
+import time
+
+import anyio.to_thread
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+
+from .imports import APIRouter, Response
+
+# Latency buckets in seconds, from cache hits to slow RPC-backed requests
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["router", "route", "method", "status"], buckets=BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled")
+
+SQL_STATEMENTS = Counter("db_statements_total", "SQL statements executed", ["operation"])
+SQL_LATENCY = Histogram("db_statement_duration_seconds", "SQL statement latency", ["operation"], buckets=BUCKETS)
+
+RPC_LATENCY = Histogram("rpc_call_duration_seconds", "JSON-RPC round-trip latency", ["method"], buckets=BUCKETS)
+RPC_ERRORS = Counter("rpc_call_errors_total", "JSON-RPC calls that failed", ["method"])
+
+CHAIN_CACHE_LOOKUPS = Counter("chain_cache_lookups_total", "Transaction and receipt lookups by where they were answered", ["source"])
+
+PENDING_EXPIRED = Counter("pending_purchases_expired_total", "Abandoned purchases moved to the archive table")
+
+THREADPOOL_BUSY = Gauge("threadpool_busy_threads", "Worker threads running sync endpoints")
+THREADPOOL_SIZE = Gauge("threadpool_max_threads", "Worker thread limit for sync endpoints")
+VERIFIER_QUEUE_DEPTH = Gauge("verifier_queue_depth", "Payment confirmations waiting for a worker")
+INDEXER_LAG_BLOCKS = Gauge("indexer_lag_blocks", "Confirmed blocks the transfer indexer has not scanned yet")
+
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency per route template, not per raw path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            router, route = _route_labels(scope)
+            REQUEST_LATENCY.labels(router, route, scope["method"], str(status)).observe(time.perf_counter() - start)
+
+
+def _route_labels(scope) -> tuple:
+    route = scope.get("route")
+    if route is None:
+        # Mounted apps (the /assets static files) have no route template
+        return ("static", "/assets") if scope["path"].startswith("/assets/") else ("app", "unmatched")
+
+    module = getattr(route.endpoint, "__module__", "")
+    router = module.rsplit(".", 1)[-1] if module.startswith("backend.routers.") else "app"
+    return router, route.path
+
+
+def instrument_engine(engine):
+    """Count and time every statement run through engine (sync or the sync side of an async engine)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append((cursor, time.perf_counter()))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        _, started = conn.info["metrics_start"].pop()
+        elapsed = time.perf_counter() - started
+        operation = statement.lstrip()[:6].upper()
+        if operation not in SQL_OPERATIONS:
+            operation = "OTHER"
+        SQL_STATEMENTS.labels(operation).inc()
+        SQL_LATENCY.labels(operation).observe(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def failed(exception_context):
+        # A statement that raises never reaches after_cursor_execute. Errors while fetching rows
+        # come after it, and errors before the cursor ran never pushed, hence the cursor check
+        context = exception_context.execution_context
+        if exception_context.connection is None or context is None:
+            return
+        starts = exception_context.connection.info.get("metrics_start")
+        if starts and starts[-1][0] is context.cursor:
+            starts.pop()
+
+
+def observe_rpc(method: str, seconds: float, failed: bool = False):
+    RPC_LATENCY.labels(method).observe(seconds)
+    if failed:
+        RPC_ERRORS.labels(method).inc()
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    from .indexer import indexer
+    from .verification import verifier
+
+    # Gauges that are cheaper to sample on scrape than to track per request
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+    THREADPOOL_SIZE.set(limiter.total_tokens)
+    VERIFIER_QUEUE_DEPTH.set(verifier.queue.qsize())
+    lag = indexer.stats()["lag_blocks"]
+    if lag is not None:
+        INDEXER_LAG_BLOCKS.set(lag)
+
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,116 @@
+# backend/migrations.py
+"""
+Bring an existing database up to the schema declared in models.py.
+
+create_all() only creates missing tables, so nullable columns and indexes
+added to tables that already exist are applied here, and sales rollup
+tables that were just created are filled from past sales. Runs at
+startup, or by hand:
+
+    python -m backend.migrations
+"""
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.orm import Session
+
+from .database import Base
+
+# Data to fill in when a column is added to a table that already has rows
+BACKFILLS = {
+    ("pending_payouts", "amount_units"):
+        "UPDATE pending_payouts SET amount_units = CAST(ROUND(amount * 100000000) AS INTEGER) "
+        "WHERE amount_units IS NULL",
+    ("products", "splits_version"):
+        "UPDATE products SET splits_version = 0 WHERE splits_version IS NULL",
+    # Archive rows used to be keyed by the transactions id itself
+    ("archived_transactions", "original_id"):
+        "UPDATE archived_transactions SET original_id = id WHERE original_id IS NULL",
+}
+
+
+def _add_missing_columns(engine, inspector, table):
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        if not column.nullable:
+            print(f"⚠️ Column {table.name}.{column.name} is missing and NOT NULL; add it by hand.")
+            continue
+        column_type = column.type.compile(dialect=engine.dialect)
+        with engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            if (table.name, column.name) in BACKFILLS:
+                conn.execute(text(BACKFILLS[(table.name, column.name)]))
+        print(f"⚙️  Added column {table.name}.{column.name}")
+
+
+def _duplicate_count(engine, index) -> int:
+    """Values that occur more than once in the indexed columns (NULLs excluded)."""
+    columns = list(index.columns)
+    duplicates = (
+        select(*columns)
+        .where(*(column.isnot(None) for column in columns))
+        .group_by(*columns)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(duplicates)).scalar()
+
+
+def _fill_empty_rollups(engine):
+    """Build the sales rollups from past sales when their tables exist but are still empty."""
+    from . import models, stats
+
+    with Session(engine) as db:
+        if not db.query(models.Transactions.id).filter(models.Transactions.status == "paid").limit(1).first():
+            return
+        if not db.query(models.MerchantStats.merchant_id).limit(1).first():
+            stats.rebuild_stats(db)
+            print("⚙️  Built sales stats from past sales")
+        elif not db.query(models.MerchantDailyStats.merchant_id).limit(1).first():
+            months = stats.backfill_daily_stats(db)
+            print(f"⚙️  Backfilled daily sales rollups ({months} months)")
+
+
+def apply_schema_updates(engine) -> list:
+    """Add missing nullable columns and declared indexes, fill new rollup tables; returns the created index names."""
+    inspector = inspect(engine)
+    created = []
+
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        _add_missing_columns(engine, inspector, table)
+
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.unique:
+                duplicates = _duplicate_count(engine, index)
+                if duplicates:
+                    columns = ", ".join(column.name for column in index.columns)
+                    print(f"⚠️ Not creating unique index {index.name}: {duplicates} duplicated values "
+                          f"in {table.name}({columns}). Resolve them and rerun migrations.")
+                    continue
+            index.create(bind=engine)
+            created.append(index.name)
+            print(f"⚙️  Created index {index.name}")
+
+    if created and engine.dialect.name == "sqlite":
+        # Refresh planner statistics so the new indexes are picked up
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+    _fill_empty_rollups(engine)
+    return created
+
+
+if __name__ == "__main__":
+    from . import models  # noqa: F401  (registers the tables)
+    from .database import engine
+
+    Base.metadata.create_all(bind=engine)
+    created = apply_schema_updates(engine)
+    print(f"✅ Schema up to date ({len(created)} indexes created).")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func, Numeric, Float
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Date, DateTime, ForeignKey, func, Numeric, Float, Index
 from sqlalchemy.orm import relationship
 from .imports import datetime
 from .database import Base
@@ -21,12 +21,17 @@ class Products(Base):
     product_name = Column(String, nullable=False)
     price = Column(Integer, nullable=False)
     merchant_id = Column(Integer, ForeignKey("users.id"))
+    splits_version = Column(Integer, nullable=True, default=0) # bumped whenever the splits are edited
     merchant = relationship("User", back_populates="products")
     
     splits = relationship("ProductSplits", back_populates="product", cascade="all, delete-orphan")
     #splits = relationship("ProductSplits", back_populates="product", cascade="all, delete")
     sales = relationship("Transactions", back_populates="product")
 
+    __table_args__ = (
+        Index("ix_products_merchant_id", "merchant_id"),
+    )
+
 class ProductSplits(Base):
     __tablename__ = "product_splits"
 
@@ -37,6 +42,10 @@ class ProductSplits(Base):
     product_id = Column(Integer, ForeignKey("products.id"))
     product = relationship("Products", back_populates="splits")
 
+    __table_args__ = (
+        Index("ix_product_splits_product_id", "product_id"),
+    )
+
 
 class Transactions(Base):
     __tablename__ = "transactions"
@@ -56,6 +65,38 @@ class Transactions(Base):
     product = relationship("Products", back_populates="sales")
     merchant = relationship("User")
 
+    __table_args__ = (
+        # Dashboard recent sales and history pages: one merchant's paid sales, newest first
+        Index("ix_transactions_merchant_status_created", "merchant_id", "status", "created_at", "id"),
+        # Per-product sales lookups
+        Index("ix_transactions_product_status_created", "product_id", "status", "created_at"),
+        # Status sweeps across all merchants (e.g. stale pending purchases)
+        Index("ix_transactions_status_created", "status", "created_at"),
+        # One on-chain transfer pays for at most one purchase
+        Index("ux_transactions_tx_hash", "tx_hash", unique=True),
+    )
+
+
+class ArchivedTransaction(Base):
+    __tablename__ = "archived_transactions"
+
+    id = Column(Integer, primary_key=True)
+    # id of the expired transactions row; not unique, SQLite hands a deleted max id to the next checkout
+    original_id = Column(Integer, nullable=True)
+    merchant_id = Column(Integer)
+    product_id = Column(Integer)
+    quantity = Column(Integer, nullable=False)
+    amount = Column(Numeric(18, 8), nullable=False)
+    status = Column(String, nullable=False) # expired
+    tx_hash = Column(String, nullable=True)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_archived_transactions_merchant_created", "merchant_id", "created_at"),
+        Index("ix_archived_transactions_original_id", "original_id"),
+    )
+
 
 class PendingPayout(Base):
     __tablename__ = "pending_payouts"
@@ -63,5 +104,102 @@ class PendingPayout(Base):
     merchant_id = Column(Integer, ForeignKey("users.id"))
     recipient_wallet = Column(String)
     amount = Column(Float)
+    amount_units = Column(BigInteger, nullable=True) # exact amount in 1e-8 MNEE
     status = Column(String, default="pending") # pending, paid
     transaction_source_id = Column(Integer, ForeignKey("transactions.id"))
+    settlement_tx_hash = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_pending_payouts_merchant_status_recipient", "merchant_id", "status", "recipient_wallet"),
+        Index("ix_pending_payouts_settlement_tx_hash", "settlement_tx_hash"),
+    )
+
+
+class PaymentVerification(Base):
+    __tablename__ = "payment_verifications"
+    id = Column(Integer, primary_key=True, index=True)
+    transaction_id = Column(Integer, ForeignKey("transactions.id"))
+    tx_hash = Column(String, nullable=False)
+    status = Column(String, default="queued") # queued, verifying, confirmed, failed
+    detail = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True) # when a pool last claimed the job
+    completed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_payment_verifications_status", "status"),
+        Index("ix_payment_verifications_transaction_id", "transaction_id"),
+    )
+
+
+class IndexerCheckpoint(Base):
+    __tablename__ = "indexer_checkpoints"
+    name = Column(String, primary_key=True)
+    block_number = Column(BigInteger, nullable=False) # last block fully scanned
+    block_hash = Column(String, nullable=True) # to notice when that block is reorganised away
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class WorkerLease(Base):
+    __tablename__ = "worker_leases"
+    name = Column(String, primary_key=True) # background job, e.g. transfer-indexer
+    holder = Column(String, nullable=False) # host:pid:nonce of the process running it
+    expires_at = Column(DateTime, nullable=False)
+
+
+class ChainRecord(Base):
+    __tablename__ = "chain_records"
+    tx_hash = Column(String, primary_key=True) # lower-cased
+    block_number = Column(BigInteger, nullable=False)
+    transaction = Column(Text, nullable=False) # JSON, as returned by eth_getTransactionByHash
+    receipt = Column(Text, nullable=False) # JSON, as returned by eth_getTransactionReceipt
+    cached_at = Column(DateTime, default=datetime.utcnow)
+
+
+class MerchantStats(Base):
+    __tablename__ = "merchant_stats"
+    merchant_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_revenue = Column(Numeric(18, 8), nullable=False, default=0)
+    units_sold = Column(Integer, nullable=False, default=0)
+    sales_count = Column(Integer, nullable=False, default=0)
+    last_sale_at = Column(DateTime, nullable=True)
+
+
+class ProductStats(Base):
+    __tablename__ = "product_stats"
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    merchant_id = Column(Integer, ForeignKey("users.id"))
+    revenue = Column(Numeric(18, 8), nullable=False, default=0)
+    units_sold = Column(Integer, nullable=False, default=0)
+    sales_count = Column(Integer, nullable=False, default=0)
+    last_sale_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_product_stats_merchant_id", "merchant_id"),
+    )
+
+
+class MerchantDailyStats(Base):
+    __tablename__ = "merchant_daily_stats"
+    merchant_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True) # UTC day of the sale
+    revenue = Column(Numeric(18, 8), nullable=False, default=0)
+    units_sold = Column(Integer, nullable=False, default=0)
+    sales_count = Column(Integer, nullable=False, default=0)
+    last_sale_at = Column(DateTime, nullable=True)
+
+
+class ProductDailyStats(Base):
+    __tablename__ = "product_daily_stats"
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    day = Column(Date, primary_key=True) # UTC day of the sale
+    merchant_id = Column(Integer, ForeignKey("users.id"))
+    revenue = Column(Numeric(18, 8), nullable=False, default=0)
+    units_sold = Column(Integer, nullable=False, default=0)
+    sales_count = Column(Integer, nullable=False, default=0)
+    last_sale_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Analytics: one merchant's products over a date range
+        Index("ix_product_daily_stats_merchant_day", "merchant_id", "day"),
+    )
@@ -0,0 +1,67 @@
+# backend/passwords.py
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from .imports import CryptContext, HTTPException, status
+from .config import BCRYPT_ROUNDS, PASSWORD_POOL_SIZE, PASSWORD_QUEUE_LIMIT
+
+pwd_cxt = CryptContext(schemes=['bcrypt'], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_pool = None
+_pool_lock = threading.Lock()
+# Running plus waiting password jobs; anything beyond is rejected instead of queued
+_slots = threading.BoundedSemaphore(max(PASSWORD_POOL_SIZE, 1) + PASSWORD_QUEUE_LIMIT)
+
+
+def _hash(password: str) -> str:
+    return pwd_cxt.hash(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> tuple:
+    return pwd_cxt.verify_and_update(password, hashed)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the server process already runs threads, which fork does not copy safely
+            _pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _run(fn, *args):
+    """Run bcrypt work in the password pool, or reject when it is saturated."""
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        if PASSWORD_POOL_SIZE <= 0:
+            return fn(*args)
+        return _get_pool().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+
+def verify_password(password: str, hashed: str) -> tuple[bool, str | None]:
+    """Check a password; also returns a new hash when the stored one uses an outdated cost."""
+    return _run(_verify_and_update, password, hashed)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,145 @@
+# backend/querytrace.py
+"""
+Request-scoped SQL tracing.
+
+Every statement run while a request is being handled is counted against
+that request, grouped by shape (the SQL text with IN-lists collapsed).
+A shape repeated QUERY_REPEAT_THRESHOLD times is the signature of an N+1
+and is logged in development. Endpoints declare how many statements they
+are allowed with @query_budget(n); enforce_query_budgets() turns an
+overrun into an error for tests and scripts:
+
+    with enforce_query_budgets():
+        client.get("/api/dashboard", headers=auth)
+
+benchmarks/query_budgets.py runs every budgeted endpoint this way.
+"""
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from .config import APP_ENV, QUERY_REPEAT_THRESHOLD
+
+_current_trace = ContextVar("query_trace", default=None)
+
+# "IN (?, ?, ?)" and "VALUES (?, ?), (?, ?)" differ only in batch size
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryTrace:
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.shapes = Counter()
+        self.budget = None
+
+    @property
+    def count(self) -> int:
+        return sum(self.shapes.values())
+
+    def record(self, statement: str):
+        self.shapes[_PLACEHOLDER_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement.strip()))] += 1
+
+    def repeated(self, threshold: int = QUERY_REPEAT_THRESHOLD) -> list:
+        """(shape, times) for statements run at least threshold times."""
+        return [(shape, times) for shape, times in self.shapes.most_common() if times >= threshold]
+
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+    def summary(self) -> str:
+        lines = [f"{self.label}: {self.count} statements" + (f" (budget {self.budget})" if self.budget is not None else "")]
+        lines += [f"    {times}× {shape[:160]}" for shape, times in self.shapes.most_common(5)]
+        return "\n".join(lines)
+
+
+def trace_engine(engine):
+    """Count statements run through engine against the active trace, if any."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.record(statement)
+
+
+def query_budget(limit: int):
+    """Declare the most SQL statements an endpoint may run per request."""
+    def decorate(endpoint):
+        endpoint.query_budget = limit
+        return endpoint
+    return decorate
+
+
+@contextmanager
+def traced(label: str = ""):
+    """Trace statements run in this context (e.g. a route function called directly)."""
+    trace = QueryTrace(label)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+# Callbacks receiving each finished request trace; used by enforce_query_budgets
+_observers = []
+_observers_lock = threading.Lock()
+
+
+@contextmanager
+def enforce_query_budgets():
+    """Raise QueryBudgetExceeded if any request handled inside the block went over its budget."""
+    finished = []
+    with _observers_lock:
+        _observers.append(finished.append)
+    try:
+        yield finished
+    finally:
+        with _observers_lock:
+            _observers.remove(finished.append)
+
+    over = [trace for trace in finished if trace.over_budget()]
+    if over:
+        raise QueryBudgetExceeded("\n".join(trace.summary() for trace in over))
+
+
+class QueryTraceMiddleware:
+    """ASGI middleware opening one trace per HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        trace = QueryTrace(f"{scope['method']} {scope['path']}")
+        token = _current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_trace.reset(token)
+            route = scope.get("route")
+            trace.budget = getattr(getattr(route, "endpoint", None), "query_budget", None)
+            self._report(trace)
+
+    def _report(self, trace: QueryTrace):
+        if APP_ENV != "production":
+            if trace.over_budget():
+                print(f"⚠️ Query budget exceeded\n{trace.summary()}")
+            for shape, times in trace.repeated():
+                print(f"⚠️ Possible N+1 in {trace.label}: {times}× {shape[:160]}")
+
+        with _observers_lock:
+            observers = list(_observers)
+        for observe in observers:
+            observe(trace)
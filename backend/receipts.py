@@ -0,0 +1,100 @@
+# backend/receipts.py
+"""
+Two-tier cache of finalized transactions and receipts, keyed by hash.
+
+Lookups go to an in-memory LRU, then the chain_records table, then the
+node. Only transactions at least CHAIN_CACHE_CONFIRMATIONS blocks deep
+are stored, so a cached answer can never be undone by a reorg; the
+current head is fetched in the same batched request as the lookup.
+Missing, pending and shallow transactions are never cached.
+"""
+import json
+import threading
+from collections import Counter
+
+from sqlalchemy import insert, select
+
+from .imports import IntegrityError
+from . import models
+from .cache import LRUCache
+from .chain import rpc
+from .config import CHAIN_CACHE_CONFIRMATIONS, CHAIN_CACHE_SIZE
+from .database import engine
+from .metrics import CHAIN_CACHE_LOOKUPS
+
+
+class ReceiptCache:
+    def __init__(self, client=rpc, bind=engine, maxsize: int = CHAIN_CACHE_SIZE,
+                 confirmations: int = CHAIN_CACHE_CONFIRMATIONS):
+        self.rpc = client
+        self.bind = bind
+        self.confirmations = confirmations
+        self.memory = LRUCache(maxsize)
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def get_transaction_with_receipt(self, tx_hash: str, timeout: float | None = None) -> tuple:
+        """Same contract as RPCClient.get_transaction_with_receipt, without RPC traffic on a hit."""
+        key = tx_hash.lower()
+
+        cached = self.memory.get(key)
+        if cached is not None:
+            self._count("memory")
+            return cached
+
+        with self.bind.connect() as conn:
+            row = conn.execute(
+                select(models.ChainRecord.transaction, models.ChainRecord.receipt)
+                .where(models.ChainRecord.tx_hash == key)
+            ).first()
+        if row is not None:
+            cached = (json.loads(row.transaction), json.loads(row.receipt))
+            self.memory.set(key, cached)
+            self._count("database")
+            return cached
+
+        self._count("miss")
+        tx, receipt, head = self.rpc.batch(
+            [
+                ("eth_getTransactionByHash", [tx_hash]),
+                ("eth_getTransactionReceipt", [tx_hash]),
+                ("eth_blockNumber", []),
+            ],
+            timeout=timeout,
+        )
+        if tx is not None and receipt is not None and receipt.get("blockNumber"):
+            block_number = int(receipt["blockNumber"], 16)
+            if int(head, 16) - block_number >= self.confirmations:
+                self._store(key, block_number, tx, receipt)
+        return tx, receipt
+
+    def _store(self, key: str, block_number: int, tx: dict, receipt: dict):
+        try:
+            with self.bind.begin() as conn:
+                conn.execute(insert(models.ChainRecord).values(
+                    tx_hash=key, block_number=block_number,
+                    transaction=json.dumps(tx), receipt=json.dumps(receipt),
+                ))
+        except IntegrityError:
+            pass  # stored by another worker meanwhile
+        self.memory.set(key, (tx, receipt))
+        self._count("stored")
+
+    def _count(self, source: str):
+        if source != "stored":
+            CHAIN_CACHE_LOOKUPS.labels(source).inc()
+        with self._lock:
+            self._counts[source] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_hits": self._counts["memory"],
+                "database_hits": self._counts["database"],
+                "misses": self._counts["miss"],
+                "stored": self._counts["stored"],
+                "memory_entries": len(self.memory),
+            }
+
+
+receipt_cache = ReceiptCache()
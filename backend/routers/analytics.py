@@ -0,0 +1,109 @@
+from datetime import date, timedelta
+
+from ..imports import APIRouter, HTTPException, AsyncSession, Depends, Query, datetime, select
+from .. import models
+from ..dependencies import get_async_db, get_current_user_async
+from ..querytrace import query_budget
+
+
+router = APIRouter(prefix="/api", tags=["Merchant - Analytics"])
+
+# Ten years of daily buckets; longer ranges should ask for months
+MAX_RANGE_DAYS = 3660
+
+
+def _period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())  # weeks start on Monday
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _periods(start: date, end: date, granularity: str) -> list:
+    """Start date of every bucket overlapping [start, end], oldest first."""
+    periods = []
+    period = _period_start(start, granularity)
+    while period <= end:
+        periods.append(period)
+        if granularity == "day":
+            period += timedelta(days=1)
+        elif granularity == "week":
+            period += timedelta(weeks=1)
+        else:
+            period = date(period.year + period.month // 12, period.month % 12 + 1, 1)
+    return periods
+
+
+def _buckets(rows, periods: list, granularity: str) -> list:
+    """Fold daily (day, revenue, units_sold, sales_count) rows into zero-filled buckets."""
+    totals = {period: [0, 0, 0] for period in periods}
+    for day, revenue, units_sold, sales_count in rows:
+        bucket = totals[_period_start(day, granularity)]
+        bucket[0] += revenue
+        bucket[1] += units_sold
+        bucket[2] += sales_count
+    return [
+        {"period": period, "revenue": revenue, "units_sold": units_sold, "sales_count": sales_count}
+        for period, (revenue, units_sold, sales_count) in totals.items()
+    ]
+
+
+@router.get("/analytics")
+@query_budget(3)
+async def analytics(
+    start: date | None = None,
+    end: date | None = None,
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    product_id: int | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """Sales per day, week or month from the daily rollups; days are UTC."""
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_RANGE_DAYS} days")
+
+    periods = _periods(start, end, granularity)
+    p = models.ProductDailyStats
+
+    product_query = (
+        select(p.product_id, models.Products.product_name, p.day, p.revenue, p.units_sold, p.sales_count)
+        .outerjoin(models.Products, models.Products.id == p.product_id)
+        .where(p.merchant_id == current_user.id, p.day >= start, p.day <= end)
+        .order_by(p.product_id, p.day)
+    )
+    if product_id is not None:
+        product_query = product_query.where(p.product_id == product_id)
+
+    series = {}
+    for row in (await db.execute(product_query)).all():
+        entry = series.setdefault(row.product_id, {"product_name": row.product_name, "rows": []})
+        entry["rows"].append((row.day, row.revenue, row.units_sold, row.sales_count))
+
+    if product_id is not None:
+        total_rows = series.get(product_id, {"rows": []})["rows"]
+    else:
+        m = models.MerchantDailyStats
+        total_rows = (await db.execute(
+            select(m.day, m.revenue, m.units_sold, m.sales_count)
+            .where(m.merchant_id == current_user.id, m.day >= start, m.day <= end)
+        )).all()
+
+    return {
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "totals": _buckets(total_rows, periods, granularity),
+        "products": [
+            {
+                "product_id": pid,
+                "product_name": entry["product_name"],
+                "buckets": _buckets(entry["rows"], periods, granularity),
+            }
+            for pid, entry in series.items()
+        ],
+    }
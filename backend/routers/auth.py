@@ -1,11 +1,18 @@
 from ..imports import APIRouter, HTTPException, Session, Depends, status, IntegrityError, timedelta, Security
 from .. import models, schemas
-from ..dependencies import get_db, pwd_cxt, create_access_token, generate_unique_slug, get_current_user
+from ..cache import invalidate_storefront
+from ..dependencies import (
+    get_db, create_access_token, generate_unique_slug, get_current_user, get_current_user_fresh, invalidate_principal
+)
 from ..config import ACCESS_TOKEN_EXPIRE_MINUTES
+from ..passwords import hash_password, verify_password
+from ..splits import invalidate_merchant_plans
+from ..querytrace import query_budget
 
 router = APIRouter(prefix="/api", tags=["Merchant - Account"])
 
 @router.post("/setup", response_model=schemas.UserResponse)
+@query_budget(5)
 def setup(request: schemas.User, db: Session = Depends(get_db)):
     username = request.username.lower()
     if db.query(models.User).filter(models.User.username == username).first():
@@ -19,7 +26,7 @@ def setup(request: schemas.User, db: Session = Depends(get_db)):
             detail="Email already registered"
         )
 
-    hashed_password = pwd_cxt.hash(request.password)
+    hashed_password = hash_password(request.password)
     new_user = models.User(
         username=username,
         email=request.email,
@@ -55,6 +62,7 @@ def setup(request: schemas.User, db: Session = Depends(get_db)):
 
 
 @router.post('/login')
+@query_budget(2)  # the UPDATE when an outdated password hash is replaced
 def login(request: schemas.Login, db: Session = Depends(get_db)):
     username = request.username.lower()
     user = db.query(models.User).filter(models.User.username == username).first()
@@ -65,7 +73,11 @@ def login(request: schemas.Login, db: Session = Depends(get_db)):
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    if not user or not pwd_cxt.verify(request.password, user.password):
+    if not user:
+        raise invalid_credentials
+
+    verified, new_hash = verify_password(request.password, user.password)
+    if not verified:
         raise invalid_credentials
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -79,37 +91,34 @@ def login(request: schemas.Login, db: Session = Depends(get_db)):
         "user": {"username": user.username, "wallet_address": user.wallet_address},
     }
 
+    if new_hash:
+        # Stored hash predates the configured bcrypt cost. Last, and with the id read first: the
+        # commit expires user, and touching it afterwards would load the row again
+        user_id = user.id
+        user.password = new_hash
+        db.commit()
+        invalidate_principal(user_id)
+
     return dashboard_data
 
 
 @router.get("/profile", response_model=schemas.Profile)
+@query_budget(1)
 def profile(
-    db: Session = Depends(get_db),
     current_user: models.User = Security(get_current_user),
 ):
-    profile = db.query(models.User).filter(
-        models.User.id == current_user.id
-    ).first()
-
-    if not profile:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    return profile
+    return current_user
 
 
 @router.put("/profile", response_model=schemas.Profile)
+@query_budget(3)
 def update_profile(
     request: schemas.Profile,
     db: Session = Depends(get_db),
-    current_user: models.User = Security(get_current_user)
+    current_user: models.User = Security(get_current_user_fresh)
 ):
-    profile = db.query(models.User).filter(
-        models.User.id == current_user.id
-    ).first()
+    profile = current_user
 
-    if not profile:
-        raise HTTPException(status_code=404, detail="Profile not found")
-    
     existing_user = db.query(models.User).filter(
         models.User.username == request.username.lower(),
         models.User.id != current_user.id
@@ -125,6 +134,9 @@ def update_profile(
     try:
         db.commit()
         db.refresh(profile)
+        invalidate_principal(profile.id)
+        invalidate_merchant_plans(profile.id)
+        invalidate_storefront(profile.unique_slug)
         return profile
     except Exception as e:
         db.rollback()
@@ -132,24 +144,24 @@ def update_profile(
 
 
 @router.post("/profile/password")
+@query_budget(3)
 def change_password(
     data: schemas.UpdatePassword,
     db: Session = Depends(get_db),
-    current_user: models.User = Security(get_current_user),
+    current_user: models.User = Security(get_current_user_fresh),
 ):
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    user = current_user
 
-    if not pwd_cxt.verify(data.old_password, user.password):
+    verified, _ = verify_password(data.old_password, user.password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Password cannot be updated",
         )
 
-    user.password = pwd_cxt.hash(data.new_password)
+    user.password = hash_password(data.new_password)
     db.commit()
     db.refresh(user)
+    invalidate_principal(user.id)
 
     return {"message": "Password updated successfully"}
\ No newline at end of file
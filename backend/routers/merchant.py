@@ -1,37 +1,65 @@
-from ..imports import APIRouter, HTTPException, Session, Depends, Security, SQLAlchemyError, status
+from ..imports import (
+    APIRouter, HTTPException, Session, AsyncSession, Depends, Security, SQLAlchemyError, status,
+    select, selectinload
+)
 from .. import models
-from ..dependencies import get_db, get_current_user
+from ..cache import invalidate_storefront
+from ..dependencies import get_db, get_async_db, get_current_user_async, get_current_user_fresh, invalidate_principal
+from ..querytrace import query_budget
 
 
 router = APIRouter(prefix="/api", tags=["Merchant"])
 
 @router.get("/dashboard")
-def dashboard(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+@query_budget(6)
+async def dashboard(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
 ):
     try:
-        my_products = db.query(models.Products).filter(
-            models.Products.merchant_id == current_user.id
-        ).all()
-
-        product_ids = [p.id for p in my_products]
+        # Lifetime totals come from the rollup maintained at confirmation time
+        merchant_stats = await db.get(models.MerchantStats, current_user.id)
+        total_earnings = merchant_stats.total_revenue if merchant_stats else 0
+        total_sales_count = merchant_stats.sales_count if merchant_stats else 0
 
-        my_sales = db.query(models.Transactions).filter(
-            models.Transactions.product_id.in_(product_ids)
-        ).order_by(models.Transactions.created_at.desc()).all()
+        recent_sales = (await db.execute(
+            select(
+                models.Transactions.tx_hash,
+                models.Products.product_name,
+                models.Transactions.amount,
+                models.Transactions.created_at,
+            )
+            .join(models.Products, models.Transactions.product_id == models.Products.id)
+            .where(
+                models.Transactions.merchant_id == current_user.id,
+                models.Transactions.status == "paid",
+            )
+            .order_by(models.Transactions.created_at.desc())
+            .limit(8)
+        )).all()
 
-        total_earnings = sum(sale.amount for sale in my_sales)
-        total_sales_count = len(my_sales)
-
-        sales_history = []
-        for sale in my_sales[:8]:
-            sales_history.append({
+        sales_history = [
+            {
                 "tx_hash": sale.tx_hash,
-                "item_sold": sale.product.product_name,
+                "item_sold": sale.product_name,
                 "earned": sale.amount,
                 "date": sale.created_at.strftime("%Y-%m-%d")
-            })
+            }
+            for sale in recent_sales
+        ]
+
+        my_products = (await db.scalars(
+            select(models.Products)
+            .options(selectinload(models.Products.splits))
+            .where(models.Products.merchant_id == current_user.id)
+        )).all()
+
+        product_stats = {
+            s.product_id: s
+            for s in await db.scalars(
+                select(models.ProductStats).where(models.ProductStats.merchant_id == current_user.id)
+            )
+        }
 
         inventory_list = []
         for p in my_products:
@@ -49,6 +77,8 @@ def dashboard(
                 "id": p.id,
                 "name": p.product_name,
                 "price": p.price,
+                "revenue": product_stats[p.id].revenue if p.id in product_stats else 0,
+                "units_sold": product_stats[p.id].units_sold if p.id in product_stats else 0,
                 "splits": product_splits
             })
 
@@ -73,20 +103,19 @@ def dashboard(
 
 
 @router.delete("/delete-account")
+@query_budget(4)
 def delete_account(
     db: Session = Depends(get_db),
-    current_user: models.User = Security(get_current_user)
+    current_user: models.User = Security(get_current_user_fresh)
 ):
-    profile = db.query(models.User).filter(
-        models.User.id == current_user.id
-    ).first()
-
-    if not profile:
-        raise HTTPException(status_code=404, detail="Account not found")
+    profile = current_user
+    user_id, slug = profile.id, profile.unique_slug
 
     try:
         db.delete(profile)
         db.commit()
+        invalidate_principal(user_id)
+        invalidate_storefront(slug)
         return {"detail": "Account deleted successfully"}
     except SQLAlchemyError as e:
         db.rollback()
@@ -1,17 +1,26 @@
-from ..imports import APIRouter, HTTPException, Session, Depends, Security, SQLAlchemyError, status
+from ..imports import (
+    APIRouter, HTTPException, Session, AsyncSession, Depends, Security, SQLAlchemyError, status,
+    select, selectinload, insert
+)
 from .. import models, schemas
-from ..dependencies import get_db, get_current_user
+from ..cache import invalidate_storefront
+from ..splits import invalidate_plan
+from ..dependencies import get_db, get_async_db, get_current_user, get_current_user_async
+from ..querytrace import query_budget
 
 router = APIRouter(prefix="/api", tags=["Merchant - Products"])
 
 @router.get("/products", tags=["Merchant - Products"], response_model=list[schemas.ProductResponse])
-def get_products(
-    db: Session = Depends(get_db),
-    current_user: models.User = Security(get_current_user),
+@query_budget(3)
+async def get_products(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Security(get_current_user_async),
 ):
-    products = db.query(models.Products).filter(
-        models.Products.merchant_id == current_user.id
-    ).all()
+    products = (await db.scalars(
+        select(models.Products)
+        .options(selectinload(models.Products.splits))
+        .where(models.Products.merchant_id == current_user.id)
+    )).all()
 
     if not products:
         return []
@@ -20,6 +29,7 @@ def get_products(
 
 
 @router.post("/add-product", tags=["Merchant - Products"], response_model=schemas.ProductResponse)
+@query_budget(6)
 def add_product(request: schemas.AddProduct,
     db: Session = Depends(get_db),
     current_user: models.User = Security(get_current_user)):
@@ -40,15 +50,16 @@ def add_product(request: schemas.AddProduct,
         db.add(new_product)
         db.flush() # Flush to get new_product.id
 
-        for split in request.splits:
-            db.add(models.ProductSplits(
-                wallet_address=split.wallet_address,
-                percentage=split.percentage,
-                product_id=new_product.id
-            ))
+        # One executemany; adding ORM objects would INSERT ... RETURNING each split separately
+        db.execute(insert(models.ProductSplits), [
+            {"wallet_address": split.wallet_address, "percentage": split.percentage, "product_id": new_product.id}
+            for split in request.splits
+        ])
 
         db.commit()
         db.refresh(new_product)
+        invalidate_plan(new_product.id)
+        invalidate_storefront(current_user.unique_slug)
         return new_product
 
     except Exception as e:
@@ -58,6 +69,7 @@ def add_product(request: schemas.AddProduct,
 
 
 @router.put("/update-product/{product_id}", tags=["Merchant - Products"], response_model=schemas.ProductResponse)
+@query_budget(9)
 def update_product(
     product_id: int,
     request: schemas.AddProduct,
@@ -75,6 +87,8 @@ def update_product(
 
     product.product_name = request.product_name
     product.price = request.price
+    # Tells every worker's cached split plan for this product that it is stale
+    product.splits_version = (product.splits_version or 0) + 1
 
     
     existing_splits = db.query(models.ProductSplits).filter(
@@ -89,21 +103,25 @@ def update_product(
         if split.wallet_address not in incoming_wallets:
             db.delete(split)
 
+    new_splits = []
     for split_data in request.splits:
         if split_data.wallet_address in existing_map:
             existing_record = existing_map[split_data.wallet_address]
             existing_record.percentage = split_data.percentage
         else:
-            new_split = models.ProductSplits(
-                wallet_address=split_data.wallet_address,
-                percentage=split_data.percentage,
-                product_id=product.id
-            )
-            db.add(new_split)
+            new_splits.append({
+                "wallet_address": split_data.wallet_address,
+                "percentage": split_data.percentage,
+                "product_id": product.id
+            })
 
     try:
+        if new_splits:
+            db.execute(insert(models.ProductSplits), new_splits)
         db.commit()
         db.refresh(product)
+        invalidate_plan(product.id)
+        invalidate_storefront(current_user.unique_slug)
         return product
     except Exception as e:
         db.rollback()
@@ -111,6 +129,7 @@ def update_product(
 
 
 @router.delete("/delete-product/{product_id}", tags=["Merchant - Products"])
+@query_budget(8)
 def delete_product(
     product_id: int,
     db: Session = Depends(get_db),
@@ -127,6 +146,8 @@ def delete_product(
     try:
         db.delete(product)
         db.commit()
+        invalidate_plan(product_id)
+        invalidate_storefront(current_user.unique_slug)
         return {"detail": "Product deleted successfully"}
     except SQLAlchemyError as e:
         db.rollback()
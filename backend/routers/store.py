@@ -1,60 +1,66 @@
-from ..imports import APIRouter, HTTPException, Session, Depends, os, Web3, load_dotenv
+import hashlib
+import json
+from collections import Counter
+
+from ..imports import (
+    APIRouter, HTTPException, Session, AsyncSession, Depends, status, Request, Response, Query,
+    IntegrityError, selectinload, jsonable_encoder, func, select
+)
 from .. import models, schemas
-from ..dependencies import get_db, get_current_user
+from ..cache import storefront_cache
+from ..dependencies import get_db, get_async_db, get_current_user
+from ..chain import MNEE_TOKEN, CHAIN_ID, w3, RPCError, decode_transfer_logs
+from ..splits import UNIT_SCALE, units_to_wei
+from ..verification import verifier, claim_purchase
+from ..receipts import receipt_cache
+from ..querytrace import query_budget
 
 router = APIRouter(prefix="/api", tags=["Client"])
-load_dotenv()
 
-RPC_URL = os.getenv("RPC_URL")
-if not RPC_URL:
-    print("RPC is invalid")
-
-MNEE_TOKEN_ADDRESS = os.getenv("MNEE_TOKEN_ADDRESS")
-if not MNEE_TOKEN_ADDRESS:
-    print("MNEE Token not gotten")
 
+@router.get("/store/{unique_slug}")
+@query_budget(3)
+async def get_store_products(
+    unique_slug: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
+    cached = storefront_cache.get(unique_slug)
 
-CHAIN_ID = os.getenv("CHAIN_ID")
-if not CHAIN_ID:
-    print("Chain ID hasn't been gotten")
+    if cached is None:
+        generation = storefront_cache.generation()
+        merchant = await db.scalar(
+            select(models.User).where(models.User.unique_slug == unique_slug)
+        )
 
+        if not merchant:
+            raise HTTPException(status_code=404, detail="Store not found")
 
-w3 = Web3(Web3.HTTPProvider(RPC_URL))
-MNEE_TOKEN = Web3.to_checksum_address(MNEE_TOKEN_ADDRESS)
-CHAIN_ID = int(CHAIN_ID)
+        products = (await db.scalars(
+            select(models.Products)
+            .options(selectinload(models.Products.splits))
+            .where(models.Products.merchant_id == merchant.id)
+        )).all()
 
-ERC20_ABI = [
-    {
-        "constant": False,
-        "inputs": [
-            {"name": "_to", "type": "address"},
-            {"name": "_value", "type": "uint256"},
-        ],
-        "name": "transfer",
-        "outputs": [{"name": "", "type": "bool"}],
-        "type": "function",
-    }
-]
+        body = json.dumps(jsonable_encoder(
+            [schemas.ProductResponse.model_validate(p) for p in products]
+        )).encode()
+        cached = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        storefront_cache.set(unique_slug, cached, generation=generation)
 
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=0, must-revalidate"}
 
-@router.get("/store/{unique_slug}")
-def get_store_products(
-    unique_slug: str,
-    db: Session = Depends(get_db),
-):
-    merchant = (
-        db.query(models.User)
-        .filter(models.User.unique_slug == unique_slug)
-        .first()
-    )
-
-    if not merchant:
-        raise HTTPException(status_code=404, detail="Store not found")
+    if_none_match = request.headers.get("if-none-match", "")
+    client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in client_etags or "*" in client_etags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-    return merchant.products
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.post("/make-purchase")
+@query_budget(5)
 def make_purchase(
     request: schemas.PurchaseRequest,
     db: Session = Depends(get_db),
@@ -67,7 +73,8 @@ def make_purchase(
         raise HTTPException(404, "Merchant not found")
 
     product = db.query(models.Products).filter(
-        models.Products.id == request.product_id
+        models.Products.id == request.product_id,
+        models.Products.merchant_id == merchant.id
     ).first()
 
     if not product:
@@ -96,82 +103,79 @@ def make_purchase(
     }
 
 
-@router.post("/confirm-payment")
+@router.post("/confirm-payment", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.VerificationStatus)
+@query_budget(3)
 def confirm_payment(
     request: schemas.ConfirmPaymentRequest,
     db: Session = Depends(get_db),
 ):
-    transaction = db.query(models.Transactions).filter(
-        models.Transactions.id == request.transaction_id,
-        models.Transactions.status == "pending",
-    ).first()
-
-    if not transaction:
-        raise HTTPException(404, "Purchase not found or already processed")
-
-    tx_hash = request.tx_hash
+    tx_hash = request.tx_hash.strip().lower()
 
+    # Only one request can move the purchase out of 'pending'; the unique
+    # index on tx_hash stops one transfer from paying for two purchases.
     try:
-        tx = w3.eth.get_transaction(tx_hash)
-        receipt = w3.eth.get_transaction_receipt(tx_hash)
-    except Exception:
-        raise HTTPException(400, "Invalid transaction hash")
+        claimed = claim_purchase(db, request.transaction_id, tx_hash)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(409, "This transaction hash was already used for another purchase")
+
+    if not claimed:
+        # A retry or a concurrent duplicate: answer with the job already handling it
+        existing = db.query(models.PaymentVerification).filter(
+            models.PaymentVerification.transaction_id == request.transaction_id,
+            models.PaymentVerification.tx_hash == tx_hash,
+        ).order_by(models.PaymentVerification.id.desc()).first()
+        if not existing:
+            raise HTTPException(404, "Purchase not found or already processed")
+        return _verification_status(existing)
+
+    # The on-chain checks run on the verifier pool; clients poll the status endpoint.
+    verification = models.PaymentVerification(
+        transaction_id=request.transaction_id,
+        tx_hash=tx_hash,
+        status="queued",
+    )
+    db.add(verification)
+    db.commit()
+    db.refresh(verification)
 
-    if tx["to"] is None or tx["to"].lower() != MNEE_TOKEN.lower():
-        raise HTTPException(400, "Transaction is not MNEE token transfer")
+    verifier.submit(verification.id)
 
-    contract = w3.eth.contract(address=MNEE_TOKEN, abi=ERC20_ABI)
+    return _verification_status(verification)
 
-    try:
-        func, params = contract.decode_function_input(tx["input"])
-    except Exception:
-        raise HTTPException(400, "Failed to decode ERC20 transaction")
 
-    if func.fn_name != "transfer":
-        raise HTTPException(400, "Not a transfer() call")
+@router.get("/confirm-payment/stats")
+@query_budget(0)
+def verification_stats():
+    return {**verifier.stats(), "receipt_cache": receipt_cache.stats()}
 
-    to_address = params["_to"]
-    merchant = db.query(models.User).get(transaction.merchant_id)
-    
-    if to_address.lower() != merchant.wallet_address.lower():
-        raise HTTPException(400, "Wrong recipient")
 
-    on_chain_value = params["_value"]
-    
-    expected_amount_wei = w3.to_wei(str(transaction.amount), "ether")
+@router.get("/confirm-payment/{verification_id}", response_model=schemas.VerificationStatus)
+@query_budget(1)
+def get_verification_status(
+    verification_id: int,
+    db: Session = Depends(get_db),
+):
+    verification = db.get(models.PaymentVerification, verification_id)
 
-    if on_chain_value != expected_amount_wei:
-        raise HTTPException(
-            400, 
-            f"Wrong amount. Expected {expected_amount_wei}, got {on_chain_value}"
-        )
+    if not verification:
+        raise HTTPException(404, "Verification not found")
 
-    product = db.query(models.Products).get(transaction.product_id)
-    
-    for split in product.splits:
-        if split.wallet_address.lower() == merchant.wallet_address.lower():
-            continue
-
-        partner_share = transaction.amount * (split.percentage / 100)
-
-        payout = models.PendingPayout(
-            merchant_id=merchant.id,
-            recipient_wallet=split.wallet_address,
-            amount=partner_share,
-            status="unpaid",
-            transaction_source_id=transaction.id
-        )
-        db.add(payout)
+    return _verification_status(verification)
 
-    transaction.status = "paid"
-    transaction.tx_hash = tx_hash
-    db.commit()
-
-    return {"status": "paid"}
 
+def _verification_status(verification: models.PaymentVerification) -> dict:
+    return {
+        "verification_id": verification.id,
+        "transaction_id": verification.transaction_id,
+        "tx_hash": verification.tx_hash,
+        "status": verification.status,
+        "detail": verification.detail,
+    }
 
 
-@router.get("/api/payouts")
+@router.get("/payouts")
+@query_budget(2)
 def get_payouts(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     payouts = db.query(models.PendingPayout).filter(
         models.PendingPayout.merchant_id == current_user.id,
@@ -188,24 +192,247 @@ def get_payouts(db: Session = Depends(get_db), current_user = Depends(get_curren
         })
     return result
 
+@router.get("/payouts/ledger")
+@query_budget(2)
+def get_payout_ledger(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    # One row per recipient, summed in SQL instead of one row per split of every sale
+    wallet = func.lower(models.PendingPayout.recipient_wallet)
+    total_units = func.sum(models.PendingPayout.amount_units)
+    rows = (
+        db.query(
+            wallet.label("recipient_wallet"),
+            total_units.label("total_units"),
+            func.count(models.PendingPayout.id).label("payout_count"),
+            func.min(models.Transactions.created_at).label("oldest_unpaid_at"),
+            func.max(models.PendingPayout.id).label("through_payout_id"),
+        )
+        .outerjoin(models.Transactions, models.Transactions.id == models.PendingPayout.transaction_source_id)
+        .filter(
+            models.PendingPayout.merchant_id == current_user.id,
+            models.PendingPayout.status == "unpaid"
+        )
+        .group_by(wallet)
+        .order_by(total_units.desc())
+        .all()
+    )
+
+    return [
+        {
+            "recipient_wallet": row.recipient_wallet,
+            "total_owed": row.total_units / UNIT_SCALE,
+            "payout_count": row.payout_count,
+            "oldest_unpaid_at": row.oldest_unpaid_at,
+            "through_payout_id": row.through_payout_id,
+        }
+        for row in rows
+    ]
+
+
+@router.get("/payouts/ledger/{recipient_wallet}")
+@query_budget(2)
+def get_recipient_payouts(
+    recipient_wallet: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: int | None = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    query = (
+        db.query(models.PendingPayout, models.Transactions.created_at)
+        .outerjoin(models.Transactions, models.Transactions.id == models.PendingPayout.transaction_source_id)
+        .filter(
+            models.PendingPayout.merchant_id == current_user.id,
+            models.PendingPayout.status == "unpaid",
+            func.lower(models.PendingPayout.recipient_wallet) == recipient_wallet.lower()
+        )
+    )
+    if cursor:
+        query = query.filter(models.PendingPayout.id > cursor)
+
+    rows = query.order_by(models.PendingPayout.id).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1][0].id)
+
+    return [
+        {
+            "id": payout.id,
+            "recipient_wallet": payout.recipient_wallet,
+            "amount": payout.amount,
+            "status": payout.status,
+            "transaction_id": payout.transaction_source_id,
+            "sold_at": sold_at,
+        }
+        for payout, sold_at in rows
+    ]
+
+
+def _merchant_transfers(tx_hash: str, merchant_wallet: str) -> Counter:
+    """(recipient, wei) -> count of MNEE transfers the merchant's wallet sent in a successful transaction."""
+    try:
+        tx, receipt = receipt_cache.get_transaction_with_receipt(tx_hash)
+    except RPCError:
+        raise HTTPException(400, "Invalid transaction hash")
+
+    if tx is None or receipt is None:
+        raise HTTPException(400, "Invalid transaction hash")
+
+    if int(receipt["status"], 16) != 1:
+        raise HTTPException(400, "Transaction reverted")
+
+    merchant_wallet = merchant_wallet.lower()
+    return Counter(
+        (recipient, value)
+        for sender, recipient, value in decode_transfer_logs(receipt)
+        if sender == merchant_wallet
+    )
+
+
+@router.post("/payouts/ledger/{recipient_wallet}/settle")
+@query_budget(5) # includes the receipt cache's lookup and store for a hash it has not seen
+def settle_recipient(
+    recipient_wallet: str,
+    request: schemas.SettleRecipientRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    tx_hash = request.tx_hash.strip().lower()
+    recipient_wallet = recipient_wallet.lower()
+
+    payout = models.PendingPayout
+    owed = [
+        payout.merchant_id == current_user.id,
+        payout.status == "unpaid",
+        func.lower(payout.recipient_wallet) == recipient_wallet,
+    ]
+    if request.through_payout_id is not None:
+        # Leave payouts that accrued after the ledger total was read
+        owed.append(payout.id <= request.through_payout_id)
+
+    # What is owed, and what this transfer already paid this recipient in an earlier settlement
+    owed_count, owed_units, spent_units = db.query(
+        func.count(payout.id).filter(*owed[1:]),
+        func.coalesce(func.sum(payout.amount_units).filter(*owed[1:]), 0),
+        func.coalesce(func.sum(payout.amount_units).filter(payout.settlement_tx_hash == tx_hash), 0),
+    ).filter(payout.merchant_id == current_user.id, func.lower(payout.recipient_wallet) == recipient_wallet).one()
+
+    if not owed_count:
+        raise HTTPException(404, "No unpaid payouts for this recipient")
+
+    sent_wei = sum(
+        value * count
+        for (recipient, value), count in _merchant_transfers(tx_hash, current_user.wallet_address).items()
+        if recipient == recipient_wallet
+    )
+    if sent_wei - units_to_wei(spent_units) < units_to_wei(owed_units):
+        raise HTTPException(400, "Transaction does not pay this recipient what is owed")
+
+    # Closes every owed row in one statement; a different count means another settlement or a new payout got in between
+    settled = db.query(payout).filter(*owed).update(
+        {"status": "paid", "settlement_tx_hash": tx_hash},
+        synchronize_session=False
+    )
+    if settled != owed_count:
+        db.rollback()
+        raise HTTPException(409, "Payouts changed while settling; reload the ledger and try again")
+
+    db.commit()
+    return {"status": "success", "settled": settled}
+
 # 2. MARK AS PAID
 
 
-@router.post("/api/payouts/{payout_id}/mark-paid")
+@router.post("/payouts/{payout_id}/mark-paid")
+@query_budget(7)
 def mark_payout_paid(
     payout_id: int, 
     request: schemas.MarkPaidRequest,
     db: Session = Depends(get_db), 
     current_user = Depends(get_current_user)
 ):
-    payout = db.query(models.PendingPayout).filter(
-        models.PendingPayout.id == payout_id,
+    # Same on-chain check as a batch settlement, for a single payout
+    settle_payouts(schemas.SettlePayoutsRequest(payout_ids=[payout_id], tx_hash=request.tx_hash), db, current_user)
+    return {"status": "success"}
+
+
+# 3. SETTLE MANY PAYOUTS WITH ONE ON-CHAIN BATCH TRANSFER
+
+
+def _payout_amount_wei(payout: models.PendingPayout) -> int:
+    return units_to_wei(payout.amount_units)
+
+
+def _overspent(db: Session, tx_hash: str, transfers: Counter) -> bool:
+    """True if the payouts closed under tx_hash need more transfers than the transaction contains."""
+    used = Counter(
+        (wallet, units_to_wei(units))
+        for wallet, units in db.query(
+            func.lower(models.PendingPayout.recipient_wallet), models.PendingPayout.amount_units
+        ).filter(models.PendingPayout.settlement_tx_hash == tx_hash)
+    )
+    return any(count > transfers[key] for key, count in used.items())
+
+
+@router.post("/payouts/settle")
+@query_budget(7) # includes the receipt cache's lookup and store for a hash it has not seen
+def settle_payouts(
+    request: schemas.SettlePayoutsRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    payout_ids = set(request.payout_ids)
+    if not payout_ids:
+        raise HTTPException(400, "No payouts given")
+
+    # Stored lower-case so a resubmission in different casing is seen as the same transfer
+    tx_hash = request.tx_hash.strip().lower()
+
+    payouts = db.query(models.PendingPayout).filter(
+        models.PendingPayout.id.in_(payout_ids),
         models.PendingPayout.merchant_id == current_user.id
-    ).first()
-    
-    if not payout:
-        raise HTTPException(404, "Payout not found")
-        
-    payout.status = "paid"
+    ).all()
+
+    if len(payouts) != len(payout_ids):
+        raise HTTPException(404, "Some payouts were not found")
+
+    if any(p.status != "unpaid" for p in payouts):
+        raise HTTPException(400, "Some payouts are already paid")
+
+    # Every MNEE transfer the merchant's wallet sent in this transaction
+    transfers = _merchant_transfers(tx_hash, current_user.wallet_address)
+    available = transfers.copy()
+
+    # Transfers already claimed by an earlier settlement of the same hash
+    for earlier in db.query(models.PendingPayout).filter(
+        models.PendingPayout.settlement_tx_hash == tx_hash
+    ):
+        available[(earlier.recipient_wallet.lower(), _payout_amount_wei(earlier))] -= 1
+
+    matched, unmatched = [], []
+    for payout in sorted(payouts, key=lambda p: p.id):
+        key = (payout.recipient_wallet.lower(), _payout_amount_wei(payout))
+        if available[key] > 0:
+            available[key] -= 1
+            matched.append(payout.id)
+        else:
+            unmatched.append(payout.id)
+
+    if not matched:
+        raise HTTPException(400, "No transfer in this transaction matches the payouts")
+
+    settled = db.query(models.PendingPayout).filter(
+        models.PendingPayout.id.in_(matched),
+        models.PendingPayout.status == "unpaid"
+    ).update(
+        {"status": "paid", "settlement_tx_hash": tx_hash},
+        synchronize_session=False
+    )
+    # Recounted after the UPDATE, which holds the write lock: a concurrent settlement of the
+    # same hash either closed some of these rows or is now visible in the recount
+    if settled != len(matched) or _overspent(db, tx_hash, transfers):
+        db.rollback()
+        raise HTTPException(409, "Payouts changed while settling; reload and try again")
     db.commit()
-    return {"status": "success"}
\ No newline at end of file
+
+    return {"status": "success", "settled": matched, "unmatched": unmatched}
@@ -1,25 +1,91 @@
-from ..imports import APIRouter, Session, Depends, Security, joinedload
+import base64
+import csv
+import io
+import json
+
+from sqlalchemy import and_, or_, select
+
+from ..imports import (
+    APIRouter, HTTPException, AsyncSession, Depends, Security, Query, Response,
+    StreamingResponse, datetime
+)
 from .. import models, schemas
-from ..dependencies import get_db, get_current_user
+from ..database import AsyncSessionLocal
+from ..dependencies import get_async_db, get_current_user_async
+from ..querytrace import query_budget
 
 router = APIRouter(prefix="/api", tags=["Merchant"])
 
-@router.get("/transactions", response_model=list[schemas.TransactionOut])
-def get_transaction_history(
-    db: Session = Depends(get_db),
-    current_user: models.User = Security(get_current_user),
-):
-    transactions = (
-        db.query(models.Transactions)
-        .join(models.Products)
-        .options(joinedload(models.Transactions.product))
-        .filter(
-            models.Products.merchant_id == current_user.id,
-            models.Transactions.status == "paid"  # <--- UPDATE 1: Only show successful sales
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_BATCH_SIZE = 1000
+
+
+def _history_query(merchant_id: int, start: datetime | None, end: datetime | None):
+    query = (
+        select(
+            models.Transactions.id,
+            models.Transactions.tx_hash,
+            models.Transactions.amount,
+            models.Transactions.created_at,
+            models.Transactions.status,
+            models.Products.product_name,
+        )
+        .join(models.Products, models.Transactions.product_id == models.Products.id)
+        .where(
+            models.Transactions.merchant_id == merchant_id,
+            models.Transactions.status == "paid"  # Only show successful sales
         )
-        .order_by(models.Transactions.created_at.desc()) # <--- UPDATE 2: Newest first
-        .all()
     )
+    if start:
+        query = query.where(models.Transactions.created_at >= start)
+    if end:
+        query = query.where(models.Transactions.created_at < end)
+    return query
+
+
+def _encode_cursor(created_at: datetime, tx_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{tx_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, tx_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(tx_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/transactions", response_model=list[schemas.TransactionOut])
+@query_budget(2)
+async def get_transaction_history(
+    response: Response,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Security(get_current_user_async),
+):
+    query = _history_query(current_user.id, start, end)
+
+    if cursor:
+        # Keyset pagination: continue strictly after the last row of the previous page
+        created_at, tx_id = _decode_cursor(cursor)
+        query = query.where(or_(
+            models.Transactions.created_at < created_at,
+            and_(models.Transactions.created_at == created_at, models.Transactions.id < tx_id),
+        ))
+
+    rows = (await db.execute(
+        query.order_by(models.Transactions.created_at.desc(), models.Transactions.id.desc())
+        .limit(limit + 1)
+    )).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].created_at, rows[-1].id)
 
     return [
         schemas.TransactionOut(
@@ -27,8 +93,65 @@ def get_transaction_history(
             tx_hash=tx.tx_hash,
             amount=tx.amount,
             bought_at=tx.created_at,
-            product_name=tx.product.product_name,
+            product_name=tx.product_name,
             status=tx.status
         )
-        for tx in transactions
-    ]
\ No newline at end of file
+        for tx in rows
+    ]
+
+
+@router.get("/transactions/export")
+@query_budget(2)
+async def export_transactions(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    current_user: models.User = Security(get_current_user_async),
+):
+    query = _history_query(current_user.id, start, end).order_by(
+        models.Transactions.created_at, models.Transactions.id
+    )
+
+    async def rows():
+        # The export owns its session: it outlives the request's dependencies
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for batch in result.partitions():
+                yield batch
+
+    async def ndjson():
+        async for batch in rows():
+            yield "".join(
+                json.dumps({
+                    "id": tx.id,
+                    "tx_hash": tx.tx_hash,
+                    "amount": str(tx.amount),
+                    "bought_at": tx.created_at.isoformat(),
+                    "product_name": tx.product_name,
+                    "status": tx.status,
+                }) + "\n"
+                for tx in batch
+            )
+
+    async def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["id", "tx_hash", "amount", "bought_at", "product_name", "status"])
+        async for batch in rows():
+            for tx in batch:
+                writer.writerow([tx.id, tx.tx_hash, tx.amount, tx.created_at.isoformat(), tx.product_name, tx.status])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+
+    if format == "csv":
+        body, media_type = csv_rows(), "text/csv"
+    else:
+        body, media_type = ndjson(), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'},
+    )
@@ -72,8 +72,23 @@ class PurchaseRequest(BaseModel):
     slug: str
 
 class ConfirmPaymentRequest(BaseModel):
-    purchase_id: int
+    transaction_id: int
     tx_hash: str
 
+class VerificationStatus(BaseModel):
+    verification_id: int
+    transaction_id: int
+    tx_hash: str
+    status: str
+    detail: Optional[str] = None
+
 class MarkPaidRequest(BaseModel):
+    tx_hash: str
+
+class SettleRecipientRequest(BaseModel):
+    tx_hash: str
+    through_payout_id: Optional[int] = None
+
+class SettlePayoutsRequest(BaseModel):
+    payout_ids: list[int]
     tx_hash: str
\ No newline at end of file
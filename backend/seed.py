@@ -1,8 +1,20 @@
 # seed.py
-from .imports import uuid, random, Session, CryptContext, secrets, string
-from . import models
+"""
+Demo and synthetic data.
 
-pwd_cxt = CryptContext(schemes=['bcrypt'], deprecated="auto")
+    python -m backend.seed                      # the 'example' demo merchant
+    python -m backend.seed generate --merchants 1000 --products 20 --splits 3 --transactions 2000000 --seed 7
+"""
+import argparse
+import math
+import time
+
+from sqlalchemy import insert
+
+from .imports import uuid, random, Session, secrets, string, datetime, timedelta, func
+from . import models, stats
+from .passwords import pwd_cxt
+from .splits import SplitPlan, generate_payouts, to_units, UNIT_SCALE
 
 def generate_unique_slug(db: Session, length: int = 8) -> str:
     alphabet = string.ascii_lowercase + string.digits
@@ -61,7 +73,6 @@ def seed_demo_user(db: Session):
 
     # 4. Create Transactions (Sales)
     sales_list = []
-    payouts_list = [] # List to hold the pending debts
 
     for _ in range(10):
         sold_item = random.choice(my_inventory)
@@ -77,48 +88,217 @@ def seed_demo_user(db: Session):
             status="paid"
         )
         sales_list.append(sale)
-        
-        # We need to add and flush here so 'sale.id' is generated for the payout foreign key
         db.add(sale)
-        db.flush() 
 
-        # --- GENERATE PENDING PAYOUTS FOR THIS SALE ---
-        # Refresh item to access splits
-        db.refresh(sold_item) 
-        
-        for split in sold_item.splits:
-            # We don't owe money to ourselves
-            if split.wallet_address.lower() == merchant.wallet_address.lower():
-                continue
-
-            # Calculate Partner's Share
-            owed_amount = sale.amount * (split.percentage / 100)
-
-            # Create Pending Payout Record
-            payout = models.PendingPayout(
-                merchant_id=merchant.id,
-                recipient_wallet=split.wallet_address,
-                amount=owed_amount,
-                status="unpaid", # This makes it show up in the Payouts tab
-                transaction_source_id=sale.id
-            )
-            payouts_list.append(payout)
+    # Flush so every sale has an id for the payout foreign key
+    db.flush()
+    stats.record_sales(db, sales_list)
 
-    # Bulk add payouts
-    db.add_all(payouts_list)
+    # --- GENERATE PENDING PAYOUTS FOR ALL SALES ---
+    payout_count = generate_payouts(db, sales_list)
     db.commit()
     
     print(f"Seeded Merchant '{merchant.username}'")
     print(f"-> {len(my_inventory)} Products")
     print(f"-> {len(sales_list)} Sales")
-    print(f"-> {len(payouts_list)} Pending Payouts created")
+    print(f"-> {payout_count} Pending Payouts created")
+
+# Rows per INSERT batch and per commit when generating
+GENERATE_BATCH_SIZE = 50_000
+
+# Relative sales volume by hour of day (UTC): quiet nights, evening peak
+HOURLY_WEIGHTS = [2, 1, 1, 1, 1, 2, 3, 5, 6, 7, 7, 8, 8, 8, 7, 7, 8, 9, 10, 10, 9, 7, 5, 3]
+HOURLY_CUM_WEIGHTS = [sum(HOURLY_WEIGHTS[:h + 1]) for h in range(24)]
+
+# Most buyers take one unit
+QUANTITIES, QUANTITY_WEIGHTS = [1, 2, 3, 5], [80, 13, 5, 2]
+
+
+def _next_id(db: Session, model) -> int:
+    return (db.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _wallet(rng: random.Random) -> str:
+    return f"0x{rng.getrandbits(160):040x}"
+
+
+def _split_percentages(rng: random.Random, partners: int) -> list:
+    """Partner percentages (each >= 1) summing to at most 90; the merchant keeps the rest."""
+    if partners == 0:
+        return []
+    total = rng.randint(partners, max(partners, min(90, 15 * partners)))
+    cuts = sorted(rng.sample(range(1, total), partners - 1)) if partners > 1 else []
+    return [b - a for a, b in zip([0] + cuts, cuts + [total])]
+
+
+def _sale_time(rng: random.Random, now: datetime, days: int) -> datetime:
+    # Volume grows linearly towards today, with a daily cycle
+    age_days = days * (1 - math.sqrt(rng.random()))
+    day = now - timedelta(days=age_days)
+    hour = rng.choices(range(24), cum_weights=HOURLY_CUM_WEIGHTS)[0]
+    sold_at = day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60), microsecond=0)
+    return sold_at if sold_at <= now else sold_at - timedelta(days=1)
+
+
+def _insert(db: Session, model, rows: list):
+    for start in range(0, len(rows), GENERATE_BATCH_SIZE):
+        db.execute(insert(model.__table__), rows[start:start + GENERATE_BATCH_SIZE])
 
-from .database import SessionLocal
+
+def generate_dataset(
+    db: Session,
+    merchants: int,
+    products: int,
+    splits: int,
+    transactions: int,
+    seed: int = 0,
+    days: int = 365,
+    partners: int = 1000,
+    pending_ratio: float = 0.02,
+    password: str = "1234",
+) -> dict:
+    """Bulk-load merchants, products, splits, sales and payouts; returns the row counts."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = pwd_cxt.hash(password)  # one bcrypt for every merchant
+    partner_wallets = [_wallet(rng) for _ in range(partners)]
+
+    # 1. Merchants, with ids assigned here so children can reference them without RETURNING
+    first_user = _next_id(db, models.User)
+    merchant_rows = [
+        {
+            "id": first_user + i,
+            "username": f"merchant{first_user + i}",
+            "email": f"merchant{first_user + i}@example.com",
+            "password": password_hash,
+            "wallet_address": _wallet(rng),
+            "unique_slug": f"m{first_user + i}",
+        }
+        for i in range(merchants)
+    ]
+    _insert(db, models.User, merchant_rows)
+
+    # 2. Products and their splits; plans are compiled in memory for the payouts
+    product_id, split_id = _next_id(db, models.Products), _next_id(db, models.ProductSplits)
+    product_rows, split_rows, plans = [], [], {}
+    catalog = {}  # merchant id -> [(product id, price in units)]
+    for merchant in merchant_rows:
+        for n in range(products):
+            # Whole tokens: Products.price is an Integer column
+            price = round(min(5000, max(1, rng.lognormvariate(3.5, 1.0))))
+            product_rows.append({
+                "id": product_id, "product_name": f"Product {n + 1}", "price": price, "merchant_id": merchant["id"],
+            })
+            catalog.setdefault(merchant["id"], []).append((product_id, to_units(price)))
+
+            shares = []
+            percentages = _split_percentages(rng, rng.randint(0, splits))
+            for percentage, wallet in zip(percentages, rng.sample(partner_wallets, len(percentages))):
+                split_rows.append({"id": split_id, "wallet_address": wallet, "percentage": percentage, "product_id": product_id})
+                shares.append((wallet, percentage * 100))
+                split_id += 1
+            split_rows.append({
+                "id": split_id, "wallet_address": merchant["wallet_address"],
+                "percentage": 100 - sum(percentages), "product_id": product_id,
+            })
+            split_id += 1
+
+            plans[product_id] = SplitPlan(product_id, merchant["id"], merchant["wallet_address"], tuple(shares))
+            product_id += 1
+    _insert(db, models.Products, product_rows)
+    _insert(db, models.ProductSplits, split_rows)
+    db.commit()
+
+    # 3. Sales, skewed so a few merchants sell far more than most, with their payouts
+    merchant_ids = [m["id"] for m in merchant_rows]
+    merchant_weights = [rng.paretovariate(1.2) for _ in merchant_ids]
+    tx_id = _next_id(db, models.Transactions)
+    payout_count = 0
+
+    for batch_start in range(0, transactions, GENERATE_BATCH_SIZE):
+        batch = min(GENERATE_BATCH_SIZE, transactions - batch_start)
+        sellers = rng.choices(merchant_ids, weights=merchant_weights, k=batch)
+        quantities = rng.choices(QUANTITIES, weights=QUANTITY_WEIGHTS, k=batch)
+
+        tx_rows, payout_rows = [], []
+        for merchant_id, quantity in zip(sellers, quantities):
+            product, price_units = rng.choice(catalog[merchant_id])
+            created_at = _sale_time(rng, now, days)
+            paid = rng.random() >= pending_ratio
+            amount_units = price_units * quantity
+
+            tx_rows.append({
+                "id": tx_id,
+                "merchant_id": merchant_id,
+                "product_id": product,
+                "quantity": quantity,
+                "amount": amount_units / UNIT_SCALE,
+                "status": "paid" if paid else "pending",
+                "tx_hash": f"0x{rng.getrandbits(256):064x}" if paid else None,
+                "created_at": created_at,
+            })
+
+            if paid:
+                # Older debts have mostly been settled
+                settled = (now - created_at).days > 30 and rng.random() < 0.8
+                for wallet, units in plans[product].payouts(amount_units):
+                    payout_rows.append({
+                        "merchant_id": merchant_id,
+                        "recipient_wallet": wallet,
+                        "amount": units / UNIT_SCALE,
+                        "amount_units": units,
+                        "status": "paid" if settled else "unpaid",
+                        "transaction_source_id": tx_id,
+                    })
+            tx_id += 1
+
+        _insert(db, models.Transactions, tx_rows)
+        _insert(db, models.PendingPayout, payout_rows)
+        db.commit()
+        payout_count += len(payout_rows)
+        print(f"   ... {batch_start + batch:,} / {transactions:,} sales")
+
+    stats.rebuild_stats(db)
+    return {
+        "merchants": merchants,
+        "products": len(product_rows),
+        "splits": len(split_rows),
+        "transactions": transactions,
+        "payouts": payout_count,
+    }
+
+
+from .database import SessionLocal, engine
+from .migrations import apply_schema_updates
 
 if __name__ == "__main__":
-    print("Seeding data...")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", choices=["demo", "generate"], default="demo")
+    parser.add_argument("--merchants", type=int, default=100)
+    parser.add_argument("--products", type=int, default=10, help="products per merchant")
+    parser.add_argument("--splits", type=int, default=2, help="max partner wallets per product")
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--partners", type=int, default=1000, help="distinct partner wallets to draw from")
+    parser.add_argument("--days", type=int, default=365, help="history length")
+    parser.add_argument("--pending-ratio", type=float, default=0.02, help="share of sales left unconfirmed")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    apply_schema_updates(engine)
     db = SessionLocal()
     try:
-        seed_demo_user(db)
+        if args.command == "demo":
+            print("Seeding data...")
+            seed_demo_user(db)
+        else:
+            print(f"Generating data (seed {args.seed})...")
+            started = time.perf_counter()
+            counts = generate_dataset(
+                db, args.merchants, args.products, args.splits, args.transactions, seed=args.seed,
+                days=args.days, partners=args.partners, pending_ratio=args.pending_ratio,
+            )
+            print(f"✅ Generated in {time.perf_counter() - started:.1f}s: "
+                  + ", ".join(f"{count:,} {name}" for name, count in counts.items()))
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,138 @@
+# backend/splits.py
+"""
+Compiled revenue-split plans and the batched payout generator.
+
+A product's splits are compiled into a SplitPlan: wallets lower-cased,
+percentages as integer basis points, the merchant's own share dropped.
+Plans are cached per process and recompiled when the product's
+splits_version or the merchant's wallet no longer match.
+Payouts are computed in integer units of 1e-8 MNEE (the precision of
+Transactions.amount), so partner shares are exact and the rounding dust
+stays with the merchant.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from .imports import Session, selectinload
+from . import models
+from .cache import LRUCache
+from .config import SPLIT_PLAN_CACHE_SIZE
+
+UNIT_SCALE = 10 ** 8        # units per MNEE
+WEI_PER_UNIT = 10 ** 10     # MNEE has 18 decimals
+BASIS_POINTS = 10_000
+
+
+@dataclass(frozen=True)
+class SplitPlan:
+    product_id: int
+    merchant_id: int
+    merchant_wallet: str
+    shares: tuple  # ((partner_wallet, basis_points), ...)
+
+    def payouts(self, amount_units: int) -> list:
+        """(wallet, units) owed to each partner for a sale of amount_units."""
+        return [(wallet, amount_units * bps // BASIS_POINTS) for wallet, bps in self.shares]
+
+
+def to_units(amount) -> int:
+    """Exact integer units for a token amount with up to 8 decimals."""
+    return int((Decimal(str(amount)) * UNIT_SCALE).to_integral_value())
+
+
+def units_to_wei(units: int) -> int:
+    return units * WEI_PER_UNIT
+
+
+def compile_plan(product: models.Products, merchant_wallet: str) -> SplitPlan:
+    merchant_wallet = merchant_wallet.lower()
+    shares = tuple(
+        (split.wallet_address.lower(), split.percentage * 100)
+        for split in product.splits
+        if split.wallet_address.lower() != merchant_wallet
+    )
+    return SplitPlan(product.id, product.merchant_id, merchant_wallet, shares)
+
+
+# Plans by product id, stored as ((splits_version, merchant_wallet), plan). Every read checks
+# the stamp against the database, so an edit made through another worker is never missed.
+_plans = LRUCache(SPLIT_PLAN_CACHE_SIZE)
+
+
+def _stamp(version, wallet: str) -> tuple:
+    return (version or 0, wallet.lower())
+
+
+def get_plans(db: Session, product_ids) -> dict:
+    """Plans for the given products; one query to check the cache, one more to compile any stale ones."""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+
+    current = (
+        db.query(models.Products.id, models.Products.splits_version, models.User.wallet_address)
+        .join(models.User, models.Products.merchant_id == models.User.id)
+        .filter(models.Products.id.in_(product_ids))
+        .all()
+    )
+
+    plans, missing = {}, set()
+    for product_id, version, wallet in current:
+        cached = _plans.get(product_id)
+        if cached is not None and cached[0] == _stamp(version, wallet):
+            plans[product_id] = cached[1]
+        else:
+            missing.add(product_id)
+
+    if missing:
+        # Read before loading, so a plan that raced an invalidation is not stored
+        generation = _plans.generation()
+        rows = (
+            db.query(models.Products, models.User.wallet_address)
+            .join(models.User, models.Products.merchant_id == models.User.id)
+            .options(selectinload(models.Products.splits))
+            .filter(models.Products.id.in_(missing))
+            .all()
+        )
+        for product, wallet in rows:
+            plan = compile_plan(product, wallet)
+            _plans.set(product.id, (_stamp(product.splits_version, wallet), plan), generation)
+            plans[product.id] = plan
+
+    return plans
+
+
+def invalidate_plan(product_id: int):
+    _plans.pop(product_id)
+
+
+def invalidate_merchant_plans(merchant_id: int):
+    """Drop a merchant's plans, e.g. after their wallet changes."""
+    _plans.discard_where(lambda entry: entry[1].merchant_id == merchant_id)
+
+
+def generate_payouts(db: Session, transactions) -> int:
+    """Bulk-insert the partner payouts for confirmed sales; returns the number of rows."""
+    transactions = list(transactions)
+    plans = get_plans(db, {t.product_id for t in transactions})
+
+    rows = []
+    for transaction in transactions:
+        plan = plans.get(transaction.product_id)
+        if plan is None:
+            continue
+        for wallet, units in plan.payouts(to_units(transaction.amount)):
+            rows.append({
+                "merchant_id": transaction.merchant_id,
+                "recipient_wallet": wallet,
+                "amount": units / UNIT_SCALE,
+                "amount_units": units,
+                "status": "unpaid",
+                "transaction_source_id": transaction.id,
+            })
+
+    if rows:
+        db.execute(insert(models.PendingPayout), rows)
+    return len(rows)
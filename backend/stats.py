@@ -0,0 +1,241 @@
+# backend/stats.py
+"""
+Per-merchant and per-product sales rollups, lifetime and per UTC day.
+
+record_sale() keeps them current as purchases are confirmed; rebuild and
+verify recompute them from the raw transactions table, and backfill
+fills the daily rollups for sales confirmed before they existed:
+
+    python -m backend.stats rebuild
+    python -m backend.stats backfill
+    python -m backend.stats verify
+"""
+import sys
+
+from sqlalchemy import Date, case, delete, insert, or_, select, update
+
+from .imports import Session, IntegrityError, datetime, func
+from . import models
+
+
+def _bump(db: Session, model, key: dict, amount, quantity: int, sold_at, sales: int = 1):
+    """Add sales to a rollup row, creating the row on first sale."""
+    columns = model.__table__.c
+    revenue = columns.total_revenue if "total_revenue" in columns else columns.revenue
+
+    values = {
+        revenue.name: revenue + amount,
+        "units_sold": columns.units_sold + quantity,
+        "sales_count": columns.sales_count + sales,
+        "last_sale_at": case(
+            (or_(columns.last_sale_at.is_(None), columns.last_sale_at < sold_at), sold_at),
+            else_=columns.last_sale_at,
+        ),
+    }
+    where = [columns[name] == value for name, value in key.items()]
+
+    if db.execute(update(model).where(*where).values(values)).rowcount:
+        return
+
+    try:
+        with db.begin_nested():
+            db.execute(insert(model).values(
+                **key,
+                **{revenue.name: amount, "units_sold": quantity, "sales_count": sales, "last_sale_at": sold_at},
+            ))
+    except IntegrityError:
+        # Another worker created the row first
+        db.execute(update(model).where(*where).values(values))
+
+
+def _rollup_keys(transaction: models.Transactions) -> tuple:
+    """(rollup model, key columns) for every rollup row a sale counts towards."""
+    day = transaction.created_at.date()
+    return (
+        (models.MerchantStats, (("merchant_id", transaction.merchant_id),)),
+        (models.ProductStats, (("product_id", transaction.product_id), ("merchant_id", transaction.merchant_id))),
+        (models.MerchantDailyStats, (("merchant_id", transaction.merchant_id), ("day", day))),
+        (models.ProductDailyStats, (("product_id", transaction.product_id), ("day", day),
+                                    ("merchant_id", transaction.merchant_id))),
+    )
+
+
+def record_sale(db: Session, transaction: models.Transactions):
+    """Fold a sale into the rollups. Call inside the transaction that marks it paid."""
+    for model, key in _rollup_keys(transaction):
+        _bump(db, model, dict(key), transaction.amount, transaction.quantity, transaction.created_at)
+
+
+def record_sales(db: Session, transactions):
+    """Fold a batch of sales into the rollups with one update per rollup row touched."""
+    totals = {}
+    for t in transactions:
+        for rollup in _rollup_keys(t):
+            amount, quantity, sales, sold_at = totals.get(rollup, (0, 0, 0, t.created_at))
+            totals[rollup] = (amount + t.amount, quantity + t.quantity, sales + 1, max(sold_at, t.created_at))
+
+    for (model, key), (amount, quantity, sales, sold_at) in totals.items():
+        _bump(db, model, dict(key), amount, quantity, sold_at, sales)
+
+
+def _raw_merchant_totals():
+    t = models.Transactions
+    return select(
+        t.merchant_id,
+        func.sum(t.amount),
+        func.sum(t.quantity),
+        func.count(t.id),
+        func.max(t.created_at),
+    ).where(t.status == "paid").group_by(t.merchant_id)
+
+
+def _raw_product_totals():
+    t = models.Transactions
+    return select(
+        t.product_id,
+        func.min(t.merchant_id),
+        func.sum(t.amount),
+        func.sum(t.quantity),
+        func.count(t.id),
+        func.max(t.created_at),
+    ).where(t.status == "paid").group_by(t.product_id)
+
+
+def _raw_merchant_daily_totals(start: datetime, end: datetime):
+    t = models.Transactions
+    day = func.date(t.created_at, type_=Date)
+    return select(
+        t.merchant_id,
+        day,
+        func.sum(t.amount),
+        func.sum(t.quantity),
+        func.count(t.id),
+        func.max(t.created_at),
+    ).where(t.status == "paid", t.created_at >= start, t.created_at < end).group_by(t.merchant_id, day)
+
+
+def _raw_product_daily_totals(start: datetime, end: datetime):
+    t = models.Transactions
+    day = func.date(t.created_at, type_=Date)
+    return select(
+        t.product_id,
+        day,
+        func.min(t.merchant_id),
+        func.sum(t.amount),
+        func.sum(t.quantity),
+        func.count(t.id),
+        func.max(t.created_at),
+    ).where(t.status == "paid", t.created_at >= start, t.created_at < end).group_by(t.product_id, day)
+
+
+def _months(db: Session):
+    """[start, end) of every calendar month that has paid sales, oldest first."""
+    t = models.Transactions
+    first, last = db.query(func.min(t.created_at), func.max(t.created_at)).filter(t.status == "paid").one()
+    if first is None:
+        return
+    month = datetime(first.year, first.month, 1)
+    while month <= last:
+        following = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+        yield month, following
+        month = following
+
+
+def backfill_daily_stats(db: Session) -> int:
+    """Recompute the daily rollups from the paid transactions, one month per commit; returns months done."""
+    months = 0
+    for start, end in _months(db):
+        for model in (models.MerchantDailyStats, models.ProductDailyStats):
+            db.execute(delete(model).where(model.day >= start.date(), model.day < end.date()))
+        db.execute(insert(models.MerchantDailyStats).from_select(
+            ["merchant_id", "day", "revenue", "units_sold", "sales_count", "last_sale_at"],
+            _raw_merchant_daily_totals(start, end),
+        ))
+        db.execute(insert(models.ProductDailyStats).from_select(
+            ["product_id", "day", "merchant_id", "revenue", "units_sold", "sales_count", "last_sale_at"],
+            _raw_product_daily_totals(start, end),
+        ))
+        db.commit()
+        months += 1
+    return months
+
+
+def rebuild_stats(db: Session):
+    """Recompute every rollup row from the paid transactions."""
+    db.execute(delete(models.MerchantStats))
+    db.execute(delete(models.ProductStats))
+    db.execute(delete(models.MerchantDailyStats))
+    db.execute(delete(models.ProductDailyStats))
+    db.execute(insert(models.MerchantStats).from_select(
+        ["merchant_id", "total_revenue", "units_sold", "sales_count", "last_sale_at"],
+        _raw_merchant_totals(),
+    ))
+    db.execute(insert(models.ProductStats).from_select(
+        ["product_id", "merchant_id", "revenue", "units_sold", "sales_count", "last_sale_at"],
+        _raw_product_totals(),
+    ))
+    db.commit()
+    backfill_daily_stats(db)
+
+
+def verify_stats(db: Session) -> list:
+    """Compare the rollups with the raw tables; returns a list of mismatch descriptions."""
+    mismatches = []
+
+    def compare(label, raw_rows, stored, key_size=1):
+        raw = {tuple(row[:key_size]): tuple(row[-4:]) for row in raw_rows}
+        for key in raw.keys() | stored.keys():
+            expected, actual = raw.get(key), stored.get(key)
+            if expected is None or actual is None:
+                mismatches.append(f"{label} {key}: expected {expected}, stored {actual}")
+                continue
+            revenue_ok = abs(float(expected[0]) - float(actual[0])) < 1e-6
+            if not revenue_ok or tuple(expected[1:]) != tuple(actual[1:]):
+                mismatches.append(f"{label} {key}: expected {expected}, stored {actual}")
+
+    compare("merchant", db.execute(_raw_merchant_totals()).all(), {
+        (s.merchant_id,): (s.total_revenue, s.units_sold, s.sales_count, s.last_sale_at)
+        for s in db.query(models.MerchantStats)
+    })
+    compare("product", db.execute(_raw_product_totals()).all(), {
+        (s.product_id,): (s.revenue, s.units_sold, s.sales_count, s.last_sale_at)
+        for s in db.query(models.ProductStats)
+    })
+    everything = (datetime.min, datetime.max)
+    compare("merchant day", db.execute(_raw_merchant_daily_totals(*everything)).all(), {
+        (s.merchant_id, s.day): (s.revenue, s.units_sold, s.sales_count, s.last_sale_at)
+        for s in db.query(models.MerchantDailyStats)
+    }, key_size=2)
+    compare("product day", db.execute(_raw_product_daily_totals(*everything)).all(), {
+        (s.product_id, s.day): (s.revenue, s.units_sold, s.sales_count, s.last_sale_at)
+        for s in db.query(models.ProductDailyStats)
+    }, key_size=2)
+    return mismatches
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal, engine
+    from .migrations import apply_schema_updates
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "rebuild"
+    models.Base.metadata.create_all(bind=engine)
+    apply_schema_updates(engine)
+    db = SessionLocal()
+    try:
+        if command == "rebuild":
+            rebuild_stats(db)
+            print("✅ Sales stats rebuilt.")
+        elif command == "backfill":
+            months = backfill_daily_stats(db)
+            print(f"✅ Daily sales rollups backfilled ({months} months).")
+        elif command == "verify":
+            mismatches = verify_stats(db)
+            for line in mismatches:
+                print(line)
+            print("✅ Sales stats match transactions." if not mismatches else f"❌ {len(mismatches)} mismatched rows.")
+            sys.exit(1 if mismatches else 0)
+        else:
+            print(__doc__)
+            sys.exit(2)
+    finally:
+        db.close()
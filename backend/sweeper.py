@@ -0,0 +1,190 @@
+# backend/sweeper.py
+"""
+Background sweeper that expires abandoned checkouts.
+
+Purchases still pending PENDING_TTL_HOURS after checkout are deleted from
+transactions and written to archived_transactions with status 'expired',
+SWEEP_BATCH_SIZE rows per commit. Each batch deletes with RETURNING and
+archives exactly the rows it removed, so a purchase claimed for
+verification mid-batch stays where it is. Purchases with a verification
+still queued are left for the verifier, and so is the newest purchase:
+transactions.id has no AUTOINCREMENT, so deleting the highest id would
+let SQLite hand it to the next checkout, and a buyer still holding the
+expired id could confirm against that purchase. Each run holds the
+pending-sweeper lease (see leases.py), so only one process sweeps.
+
+    python -m backend.sweeper           # one sweep, then print the counts
+"""
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy import delete, exists, func, insert, select
+
+from .imports import datetime, Session
+from . import models
+from .config import PENDING_TTL_HOURS, SWEEP_BATCH_SIZE, SWEEP_INTERVAL_SECONDS
+from .database import SessionLocal
+from .leases import Lease
+from .metrics import PENDING_EXPIRED
+
+# Pause between batches so writers waiting on the database lock get a turn
+BATCH_PAUSE_SECONDS = 0.01
+
+ARCHIVED_COLUMNS = ("merchant_id", "product_id", "quantity", "amount", "tx_hash", "created_at")
+
+
+class PendingSweeper:
+    """Expires stale pending purchases on a background thread."""
+
+    def __init__(self, session_factory=SessionLocal, ttl_hours: float = PENDING_TTL_HOURS,
+                 batch_size: int = SWEEP_BATCH_SIZE, interval: float = SWEEP_INTERVAL_SECONDS,
+                 lease: Lease | None = None):
+        self.session_factory = session_factory
+        self.lease = lease
+        self.ttl_hours = ttl_hours
+        self.batch_size = batch_size
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._expired = 0
+        self._last_run = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="pending-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join(timeout=30)
+        self._thread = None
+        if self.lease is not None:
+            self.lease.release()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                report = self.run_once()
+                if report["expired"]:
+                    print(f"✅ Expired {report['expired']} pending purchases older than {self.ttl_hours:g}h "
+                          f"({report['archived']} archived in {report['batches']} batches, {report['seconds']}s)")
+            except Exception as e:
+                print(f"❌ Pending sweeper error: {e}")
+            self._stop.wait(self.interval)
+
+    def run_once(self) -> dict:
+        """Expire every pending purchase past the TTL; returns what this run did.
+
+        Does nothing while another process holds the lease.
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=self.ttl_hours)
+        report = {"expired": 0, "archived": 0, "verifications_removed": 0, "batches": 0}
+        start = time.perf_counter()
+
+        db = self.session_factory()
+        try:
+            # Renewed before every batch, so a long backlog never outlives the lease
+            while not self._stop.is_set() and (self.lease is None or self.lease.acquire()):
+                expired, archived, removed = self._sweep_batch(db, cutoff)
+                if not expired:
+                    break
+                report["expired"] += expired
+                report["archived"] += archived
+                report["verifications_removed"] += removed
+                report["batches"] += 1
+                if expired < self.batch_size:
+                    break
+                self._stop.wait(BATCH_PAUSE_SECONDS)
+        finally:
+            db.close()
+
+        report["seconds"] = round(time.perf_counter() - start, 3)
+        PENDING_EXPIRED.inc(report["expired"])
+        with self._lock:
+            self._runs += 1
+            self._expired += report["expired"]
+            self._last_run = {**report, "finished_at": datetime.utcnow().isoformat()}
+        return report
+
+    def _sweep_batch(self, db: Session, cutoff: datetime) -> tuple:
+        """Move one batch to the archive in a single commit; returns (expired, archived, verifications removed)."""
+        t = models.Transactions
+        verification = models.PaymentVerification
+
+        ids = db.execute(
+            select(t.id)
+            .where(
+                t.status == "pending",
+                t.created_at < cutoff,
+                # Keeps the highest id in use, so SQLite never reuses an expired one
+                t.id < select(func.max(t.id)).scalar_subquery(),
+                ~exists().where(
+                    verification.transaction_id == t.id,
+                    verification.status.in_(["queued", "verifying"]),
+                ),
+            )
+            .order_by(t.created_at)
+            .limit(self.batch_size)
+        ).scalars().all()
+        if not ids:
+            return 0, 0, 0
+
+        # Failed attempts would otherwise point at a row that no longer exists
+        removed = db.execute(
+            delete(verification)
+            .where(verification.transaction_id.in_(ids), verification.status == "failed")
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        rows = db.execute(
+            delete(t)
+            .where(t.id.in_(ids), t.status == "pending")
+            .returning(t.id.label("original_id"), *(t.__table__.c[name] for name in ARCHIVED_COLUMNS))
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        archived_at = datetime.utcnow()
+        if rows:
+            db.execute(insert(models.ArchivedTransaction), [
+                {**row._asdict(), "status": "expired", "archived_at": archived_at} for row in rows
+            ])
+        db.commit()
+        return len(rows), len(rows), removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "lease_held": self.lease is None or self.lease.held,
+                "runs": self._runs,
+                "expired": self._expired,
+                "last_run": self._last_run,
+            }
+
+
+sweeper = PendingSweeper(lease=Lease("pending-sweeper"))
+
+
+if __name__ == "__main__":
+    from .database import engine
+    from .migrations import apply_schema_updates
+
+    models.Base.metadata.create_all(bind=engine)
+    apply_schema_updates(engine)
+    report = sweeper.run_once()
+    held = sweeper.lease.held
+    sweeper.lease.release()
+    if not held:
+        print("⚠️ Another process is running the pending sweeper; nothing swept.")
+        sys.exit(1)
+    print(f"✅ Expired {report['expired']} pending purchases older than {sweeper.ttl_hours:g}h; "
+          f"{report['archived']} archived, {report['verifications_removed']} failed verifications removed, "
+          f"{report['batches']} batches in {report['seconds']}s.")
@@ -0,0 +1,268 @@
+# backend/verification.py
+import queue
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from sqlalchemy import and_, or_, update
+
+from .imports import datetime, Session
+from . import models, stats
+from .splits import generate_payouts
+from .chain import w3, MNEE_TOKEN, token_contract, RPCError
+from .config import VERIFIER_STALE_SECONDS, VERIFIER_WORKERS
+from .database import SessionLocal
+from .receipts import receipt_cache
+
+
+class PaymentVerificationError(Exception):
+    """Raised when an on-chain payment does not match the purchase."""
+
+
+def confirm_purchase(db: Session, transaction: models.Transactions, tx_hash: str) -> bool:
+    """Check the transfer behind tx_hash and mark the claimed purchase as paid.
+
+    Returns False if the purchase was no longer verifying under tx_hash.
+    """
+    try:
+        tx, receipt = receipt_cache.get_transaction_with_receipt(tx_hash)
+    except RPCError:
+        raise PaymentVerificationError("Invalid transaction hash")
+
+    if tx is None or receipt is None:
+        raise PaymentVerificationError("Invalid transaction hash")
+
+    if int(receipt["status"], 16) != 1:
+        raise PaymentVerificationError("Transaction reverted")
+
+    if tx["to"] is None or tx["to"].lower() != MNEE_TOKEN.lower():
+        raise PaymentVerificationError("Transaction is not MNEE token transfer")
+
+    try:
+        func, params = token_contract.decode_function_input(tx["input"])
+    except Exception:
+        raise PaymentVerificationError("Failed to decode ERC20 transaction")
+
+    if func.fn_name != "transfer":
+        raise PaymentVerificationError("Not a transfer() call")
+
+    to_address = params["_to"]
+    merchant = db.get(models.User, transaction.merchant_id)
+
+    if to_address.lower() != merchant.wallet_address.lower():
+        raise PaymentVerificationError("Wrong recipient")
+
+    on_chain_value = params["_value"]
+    expected_amount_wei = w3.to_wei(str(transaction.amount), "ether")
+
+    if on_chain_value != expected_amount_wei:
+        raise PaymentVerificationError(
+            f"Wrong amount. Expected {expected_amount_wei}, got {on_chain_value}"
+        )
+
+    # Only the caller that moves the claim to 'paid' credits the sale; another
+    # pool re-queuing the same job after a restart finds the row already paid
+    paid = db.execute(
+        update(models.Transactions)
+        .where(
+            models.Transactions.id == transaction.id,
+            models.Transactions.status == "verifying",
+            models.Transactions.tx_hash == tx_hash,
+        )
+        .values(status="paid")
+    ).rowcount == 1
+    if paid:
+        generate_payouts(db, [transaction])
+        stats.record_sale(db, transaction)
+    return paid
+
+
+def claim_purchase(db: Session, transaction_id: int, tx_hash: str) -> bool:
+    """Move a pending purchase to 'verifying' under tx_hash; False if it was not pending.
+
+    Raises IntegrityError if tx_hash already belongs to another purchase.
+    """
+    return db.execute(
+        update(models.Transactions)
+        .where(models.Transactions.id == transaction_id, models.Transactions.status == "pending")
+        .values(status="verifying", tx_hash=tx_hash)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+
+def release_claim(db: Session, transaction_id: int, tx_hash: str):
+    """Return a purchase whose verification failed to 'pending' so it can be paid again."""
+    db.execute(
+        update(models.Transactions)
+        .where(
+            models.Transactions.id == transaction_id,
+            models.Transactions.status == "verifying",
+            models.Transactions.tx_hash == tx_hash,
+        )
+        .values(status="pending", tx_hash=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def claim_job(db: Session, verification_id: int) -> bool:
+    """Move a queued job, or one abandoned mid-verification, to 'verifying'; False if another pool has it."""
+    job = models.PaymentVerification
+    abandoned = datetime.utcnow() - timedelta(seconds=VERIFIER_STALE_SECONDS)
+    return db.execute(
+        update(job)
+        .where(
+            job.id == verification_id,
+            or_(
+                job.status == "queued",
+                and_(job.status == "verifying", or_(job.started_at.is_(None), job.started_at < abandoned)),
+            ),
+        )
+        .values(status="verifying", started_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+
+class VerificationPool:
+    """Background workers that drain the payment verification queue."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._processed = 0
+        self._failed = 0
+        self._wait_times = deque(maxlen=1000)
+        self._latencies = deque(maxlen=1000)
+
+    def start(self):
+        if self._threads:
+            return
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"verifier-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        # Pick up jobs that were still queued when the previous process stopped
+        db = SessionLocal()
+        try:
+            unfinished = db.query(models.PaymentVerification.id).filter(
+                models.PaymentVerification.status.in_(["queued", "verifying"])
+            ).order_by(models.PaymentVerification.id).all()
+        finally:
+            db.close()
+
+        for (verification_id,) in unfinished:
+            self.submit(verification_id)
+
+    def stop(self):
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+
+    def submit(self, verification_id: int):
+        self.queue.put((verification_id, time.monotonic()))
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+
+            verification_id, queued_at = job
+            started_at = time.monotonic()
+            with self._lock:
+                self._in_flight += 1
+
+            ok = self._process(verification_id)
+
+            finished_at = time.monotonic()
+            with self._lock:
+                self._in_flight -= 1
+                self._processed += 1
+                if not ok:
+                    self._failed += 1
+                self._wait_times.append(started_at - queued_at)
+                self._latencies.append(finished_at - queued_at)
+
+    def _process(self, verification_id: int) -> bool:
+        db = SessionLocal()
+        try:
+            if not claim_job(db, verification_id):
+                # Finished, or being verified by another pool
+                return True
+            db.commit()
+            job = db.get(models.PaymentVerification, verification_id)
+
+            transaction = db.get(models.Transactions, job.transaction_id)
+            if transaction and transaction.status == "pending":
+                # Queued before claims were taken at submission
+                if claim_purchase(db, transaction.id, job.tx_hash):
+                    db.commit()
+                db.refresh(transaction)
+
+            try:
+                if transaction and transaction.status == "verifying" and transaction.tx_hash == job.tx_hash:
+                    if not confirm_purchase(db, transaction, job.tx_hash):
+                        db.refresh(transaction)  # finished by another pool meanwhile
+                if transaction and transaction.status == "paid" and (transaction.tx_hash or "").lower() == job.tx_hash.lower():
+                    # Paid from this transfer, here, by another pool or by the transfer indexer
+                    job.status = "confirmed"
+                else:
+                    raise PaymentVerificationError("Purchase not found or already processed")
+            except PaymentVerificationError as e:
+                db.rollback()
+                release_claim(db, job.transaction_id, job.tx_hash)
+                job.status = "failed"
+                job.detail = str(e)
+
+            job.completed_at = datetime.utcnow()
+            db.commit()
+            return job.status == "confirmed"
+
+        except Exception as e:
+            db.rollback()
+            print(f"Verification {verification_id} error: {e}")
+            job = db.get(models.PaymentVerification, verification_id)
+            if job is not None:
+                release_claim(db, job.transaction_id, job.tx_hash)
+                job.status = "failed"
+                job.detail = "Verification error"
+                job.completed_at = datetime.utcnow()
+                db.commit()
+            return False
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            wait_times = sorted(self._wait_times)
+            latencies = sorted(self._latencies)
+            return {
+                "workers": len(self._threads),
+                "queue_depth": self.queue.qsize(),
+                "in_flight": self._in_flight,
+                "processed": self._processed,
+                "failed": self._failed,
+                "queue_wait_seconds": _summary(wait_times),
+                "latency_seconds": _summary(latencies),
+            }
+
+
+def _summary(samples: list) -> dict:
+    """p50/p95/max over an already sorted list of samples."""
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    return {
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max": samples[-1],
+    }
+
+
+verifier = VerificationPool(VERIFIER_WORKERS)
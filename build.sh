@@ -13,5 +13,8 @@ npm install
 npm run build
 cd ..
 
+# Precompress the bundle and record the sources it was built from
+python -m backend.config
+
 # 3. (Optional) Run database migrations
 # python backend/api.py # or wherever your migration logic is
\ No newline at end of file
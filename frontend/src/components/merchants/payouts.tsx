@@ -26,12 +26,13 @@ const ERC20_ABI = [
   },
 ];
 
+// One row per recipient: the ledger sums their unpaid splits on the server
 type Payout = {
   id: number;
   recipient_wallet: string;
   amount: number;
-  product_name: string;
-  status: "unpaid" | "processing" | "paid";
+  payout_count: number;
+  through_payout_id: number;
   created_at: string;
 };
 
@@ -44,12 +45,21 @@ export default function Payouts() {
   const fetchPayouts = async () => {
     try {
       const token = localStorage.getItem("token");
-      const res = await fetch("http://localhost:8000/api/payouts", {
+      const res = await fetch("http://localhost:8000/api/payouts/ledger", {
         headers: { Authorization: `Bearer ${token}` },
       });
       if (res.ok) {
         const data = await res.json();
-        setPayouts(data);
+        setPayouts(
+          data.map((row: any) => ({
+            id: row.through_payout_id,
+            recipient_wallet: row.recipient_wallet,
+            amount: row.total_owed,
+            payout_count: row.payout_count,
+            through_payout_id: row.through_payout_id,
+            created_at: row.oldest_unpaid_at,
+          }))
+        );
       }
     } catch (err) {
       console.error("Failed to fetch payouts", err);
@@ -98,17 +108,26 @@ export default function Payouts() {
       // E. Update Backend
       if (tx.transactionHash) {
         const token = localStorage.getItem("token");
-        await fetch(
-          `http://localhost:8000/api/payouts/${payout.id}/mark-paid`,
+        // The server checks the transfer on-chain before closing the ledger
+        const res = await fetch(
+          `http://localhost:8000/api/payouts/ledger/${payout.recipient_wallet}/settle`,
           {
             method: "POST",
             headers: {
               Authorization: `Bearer ${token}`,
               "Content-Type": "application/json",
             },
-            body: JSON.stringify({ tx_hash: tx.transactionHash }),
+            body: JSON.stringify({
+              tx_hash: tx.transactionHash,
+              through_payout_id: payout.through_payout_id,
+            }),
           }
         );
+        if (!res.ok) {
+          const body = await res.json().catch(() => ({}));
+          alert(`Transfer sent, but settlement was rejected: ${body.detail ?? res.status}`);
+          return;
+        }
 
         // Remove from list or mark as paid locally
         setPayouts((prev) => prev.filter((p) => p.id !== payout.id));
@@ -198,9 +217,9 @@ export default function Payouts() {
                       </div>
                       <p className="text-xs text-[#1a3a2a]/40 mt-1 flex items-center gap-1">
                         <Clock className="w-3 h-3" />
-                        From sale:{" "}
+                        {payout.payout_count} unpaid sales since{" "}
                         <span className="font-medium">
-                          {payout.product_name || "Unknown Product"}
+                          {new Date(payout.created_at).toLocaleDateString()}
                         </span>
                       </p>
                     </div>
@@ -111,7 +111,20 @@ const PurchaseModal = ({
         }
       );
 
-      if (confirmRes.ok) {
+      // Verification runs in the background; poll until it settles
+      let verification = confirmRes.ok ? await confirmRes.json() : null;
+      while (
+        verification &&
+        (verification.status === "queued" || verification.status === "verifying")
+      ) {
+        await new Promise((resolve) => setTimeout(resolve, 1500));
+        const statusRes = await fetch(
+          `http://localhost:8000/api/confirm-payment/${verification.verification_id}`
+        );
+        verification = statusRes.ok ? await statusRes.json() : null;
+      }
+
+      if (verification?.status === "confirmed") {
         alert("Payment Successful!");
         onClose();
       } else {